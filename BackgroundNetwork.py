@@ -0,0 +1,171 @@
+#!/home/mplace/anaconda3/bin/python
+"""
+Program: BackgroundNetwork.py
+
+Purpose: Load the background protein interaction network once and index it, so the
+         shared interactor scripts and the notebook take the hypergeometric inputs from
+         the network itself instead of separate, hand made files:
+
+             N   number of proteins in the network (the population size, 4638 for
+                 reference/Background_Network.csv)
+             M   degree of each protein, its number of distinct interaction partners,
+                 either direction (replaces Number_Interactions_Each_Protein.csv)
+
+         The edges are held as integer arrays over the sorted protein list, together with
+         a directed adjacency (CSR, one count per Protein1 -> Protein2 edge row) and an
+         undirected one (CSR, 1 where two proteins interact in either direction).
+
+Cache:   the index is written next to the edge list as a binary .npz cache,
+         <edge list>.index.npz, holding the sha256 of the edge list it was built from.
+         Later loads read the cache instead of parsing the csv; a cache whose hash does
+         not match the file (the network was edited) is rebuilt.  Build it up front with
+
+             BackgroundNetwork.py -f reference/Background_Network.csv
+
+Input  : background network edge list, csv  Protein1,Protein2,Interaction,Directed
+         YCR066W,YBR088C,ubiquitination,1
+
+Output : BackgroundNetwork object, and the .npz cache
+"""
+import argparse
+import hashlib
+import numpy as np
+import os
+import pandas as pd
+import scipy.sparse as sp
+
+# edge list columns, Interaction and Directed are optional
+EdgeColumns = ['Protein1', 'Protein2', 'Interaction', 'Directed']
+
+# cache file name, appended to the edge list file name
+CacheSuffix = '.index.npz'
+
+
+def fileHash(filename):
+    """ sha256 hex digest of a file's contents """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BackgroundNetwork(object):
+    """ An indexed background network.
+
+    Attributes:
+        proteins    - sorted protein names, numpy str array, row / column order of the matrices
+        index       - dict, protein -> position in proteins
+        source      - int32 array, Protein1 position of every edge row, in file order
+        target      - int32 array, Protein2 position of every edge row
+        interaction - str array, Interaction of every edge row
+        directed    - int8 array, Directed of every edge row
+        adjacency   - protein x protein CSR matrix, number of Protein1 -> Protein2 edge rows
+        undirected  - protein x protein CSR matrix, 1 where two proteins interact either way
+        degrees     - int array, M, distinct interaction partners of every protein
+        N           - number of proteins
+        fileHash    - sha256 of the edge list the index was built from, None if not from a file
+    """
+
+    def __init__(self, proteins, source, target, interaction, directed, fileHash=None):
+        self.proteins    = np.asarray(proteins, dtype=str)
+        self.index       = { prot : i for i, prot in enumerate(self.proteins) }
+        self.source      = np.asarray(source, dtype=np.int32)
+        self.target      = np.asarray(target, dtype=np.int32)
+        self.interaction = np.asarray(interaction, dtype=str)
+        self.directed    = np.asarray(directed, dtype=np.int8)
+        self.fileHash    = fileHash
+        self.N           = len(self.proteins)
+        shape            = (self.N, self.N)
+        self.adjacency   = sp.csr_matrix((np.ones(len(self.source), dtype=np.int32), (self.source, self.target)), shape=shape)
+        both             = self.adjacency + self.adjacency.T
+        self.undirected  = (both > 0).astype(np.int8).tocsr()
+        self.degrees     = np.diff(self.undirected.indptr)
+
+    def __len__(self):
+        return self.N
+
+    def degree(self, proteins):
+        """ M for an array of protein names, -1 for proteins not in the network """
+        pos = pd.Series(proteins).map(self.index)
+        return np.where(pos.notna(), self.degrees[pos.fillna(0).astype(np.int64).to_numpy()], -1)
+
+    def edges(self):
+        """ The edge list as a DataFrame, Protein1,Protein2,Interaction,Directed in file order """
+        return pd.DataFrame({ 'Protein1'    : self.proteins[self.source],
+                              'Protein2'    : self.proteins[self.target],
+                              'Interaction' : self.interaction,
+                              'Directed'    : self.directed })
+
+    def save(self, cache):
+        """ Write the index to a .npz cache, through a temporary file so a reader never sees
+        a partial cache """
+        tmp = '%s.%d.tmp' %(cache, os.getpid())
+        with open(tmp, 'wb') as out:
+            np.savez(out, proteins=self.proteins, source=self.source, target=self.target,
+                     interaction=self.interaction, directed=self.directed, fileHash=np.array(self.fileHash or ''))
+        os.replace(tmp, cache)
+
+
+def fromEdges(df, fileHash=None):
+    """ BackgroundNetwork from an edge list DataFrame """
+    if 'Protein1' not in df.columns or 'Protein2' not in df.columns:
+        raise ValueError('Background network needs Protein1 and Protein2 columns')
+    first  = df['Protein1'].to_numpy(dtype=str)
+    second = df['Protein2'].to_numpy(dtype=str)
+    proteins, codes = np.unique(np.concatenate([first, second]), return_inverse=True)
+    interaction = df['Interaction'].fillna('').to_numpy(dtype=str) if 'Interaction' in df.columns else np.full(len(df), '')
+    directed    = df['Directed'].fillna(0).to_numpy() if 'Directed' in df.columns else np.zeros(len(df))
+    return BackgroundNetwork(proteins, codes[:len(df)], codes[len(df):], interaction, directed, fileHash)
+
+
+def loadCache(cache, digest=None):
+    """ BackgroundNetwork from a .npz cache, None when the cache is missing, unreadable or
+    (digest given) was built from a different edge list """
+    try:
+        with np.load(cache) as data:
+            if digest is not None and str(data['fileHash']) != digest:
+                return None
+            return BackgroundNetwork(data['proteins'], data['source'], data['target'], data['interaction'],
+                                     data['directed'], str(data['fileHash']) or None)
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+
+
+def load(source, cache=True):
+    """ BackgroundNetwork from an edge list csv file or a DataFrame.  For files the index is
+    cached in <file>.index.npz (or the file named by cache), rebuilt when the edge list hash
+    changes; cache False never reads or writes a cache. """
+    if isinstance(source, pd.DataFrame):
+        return fromEdges(source)
+    if cache is False:
+        return fromEdges(pd.read_csv(source), fileHash(source))
+    cacheFile = source + CacheSuffix if cache is True else cache
+    digest    = fileHash(source)
+    network   = loadCache(cacheFile, digest)
+    if network is None:
+        network = fromEdges(pd.read_csv(source), digest)
+        try:
+            network.save(cacheFile)
+        except OSError:                                        # read only location, run without a cache
+            pass
+    return network
+
+
+def main():
+    """
+    Process command line arguments and build the cache of a background network.
+    """
+    cmdparser = argparse.ArgumentParser(description="Index a background network and write its binary cache.",
+                                        usage='%(prog)s -f <edge list .csv> [-o <cache.npz>]', prog='BackgroundNetwork.py')
+    cmdparser.add_argument('-f', '--file', action='store', dest='FILE', required=True, help='Edge list, Protein1,Protein2,Interaction,Directed', metavar='')
+    cmdparser.add_argument('-o', '--out',  action='store', dest='OUT', help='Cache file, (<edge list>.index.npz)', metavar='')
+    cmdResults = vars(cmdparser.parse_args())
+
+    network = load(cmdResults['FILE'], cmdResults['OUT'] if cmdResults['OUT'] else True)
+    print('%s: %d proteins (N), %d edges, %d undirected interactions, cache %s' %(cmdResults['FILE'], network.N, len(network.source),
+          (network.undirected.nnz + network.undirected.diagonal().sum()) // 2, cmdResults['OUT'] if cmdResults['OUT'] else cmdResults['FILE'] + CacheSuffix))
+
+
+if __name__ == "__main__":
+    main()
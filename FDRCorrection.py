@@ -0,0 +1,86 @@
+"""
+Program: FDRCorrection.py
+
+Purpose: Multiple testing correction of p-values, shared by the shared interactor and the
+         kinase-module (KL) FDR steps.
+
+         Methods, the adjusted p-value (q-value) of the i-th smallest of m p-values:
+
+             bh      Benjamini-Hochberg     min over j >= i of  p(j) m / j
+             by      Benjamini-Yekutieli    the BH value times c(m) = 1 + 1/2 + ... + 1/m,
+                                            valid under any dependence between the tests
+             storey  Storey q-values        the BH value times pi0, the estimated fraction
+                                            of true nulls, #{p > lambda} / (m (1 - lambda))
+
+         A test is significant when its adjusted p-value is <= Q, which is the standard
+         step-up rule, every p-value up to the largest p(k) <= (k / m) Q is rejected.  Tied
+         p-values always get the same adjusted value and the same call.
+
+         Correction is global, over every p-value, or per group (i.e. per submodule) when
+         groups are given, each group is corrected as its own family of tests.  The
+         p-values are sorted once (np.lexsort on group, p-value), the running minimum
+         within each group is a single groupby cummin, O(n log n) for all groups at once.
+
+Input  : numpy array (or Series) of p-values, optionally an array of group labels
+
+Output : arrays in input order, see rankTests, adjust and significant
+"""
+import numpy as np
+import pandas as pd
+
+# correction methods
+Methods = [ 'bh', 'by', 'storey' ]
+
+# Storey's lambda, p-values above it are taken to come from true nulls
+Lambda = 0.5
+
+
+def rankTests(pvalues, groups=None):
+    """ (order, rank, tests), the positions that sort the p-values (by group, then p-value, ties
+    in input order), and in that sorted order the rank i of each p-value within its group and
+    the number of tests m of its group """
+    pvalues = np.asarray(pvalues, dtype=np.float64)
+    codes   = np.zeros(len(pvalues), dtype=np.int64) if groups is None else pd.factorize(np.asarray(groups))[0]
+    order   = np.lexsort((pvalues, codes))
+    sizes   = np.bincount(codes, minlength=1)
+    starts  = np.cumsum(sizes) - sizes                                       # first sorted position of every group
+    sortedCodes = codes[order]
+    rank    = np.arange(len(pvalues)) - starts[sortedCodes] + 1
+    return order, rank, sizes[sortedCodes]
+
+
+def adjust(pvalues, method='bh', groups=None, lam=Lambda):
+    """ Adjusted p-values (q-values), in input order.  method is one of Methods, groups
+    (optional) labels each p-value with its family of tests.  NaN p-values are not tests,
+    they do not count towards m and stay NaN. """
+    if method not in Methods:
+        raise ValueError('Unknown correction method %s, use one of %s' %(method, ', '.join(Methods)))
+    pvalues = np.asarray(pvalues, dtype=np.float64)
+    missing = np.isnan(pvalues)
+    if missing.any():
+        result = np.full(len(pvalues), np.nan)
+        result[~missing] = adjust(pvalues[~missing], method, None if groups is None else np.asarray(groups)[~missing], lam)
+        return result
+    if len(pvalues) == 0:
+        return np.array([], dtype=np.float64)
+    order, rank, tests = rankTests(pvalues, groups)
+    sortedP = pvalues[order]
+    group   = np.cumsum(rank == 1)                                           # sorted group number, groups are contiguous
+    scaled  = sortedP * tests / rank
+    if method == 'by':
+        harmonic = np.cumsum(1.0 / np.arange(1, tests.max() + 1))
+        scaled   = scaled * harmonic[tests - 1]
+    elif method == 'storey':
+        # null fraction of each group, counting at least one p-value above lambda so pi0 is never 0
+        above  = pd.Series(sortedP > lam).groupby(group).transform('sum').to_numpy()
+        scaled = scaled * np.minimum(1.0, np.maximum(above, 1) / (tests * (1.0 - lam)))
+    # running minimum from the largest p-value down, within each group
+    adjusted = pd.Series(scaled[::-1]).groupby(group[::-1]).cummin().to_numpy()[::-1]
+    result   = np.empty(len(pvalues))
+    result[order] = np.minimum(adjusted, 1.0)
+    return result
+
+
+def significant(pvalues, Q=0.05, method='bh', groups=None, lam=Lambda):
+    """ Boolean array, True where the adjusted p-value is <= Q, False for NaN p-values """
+    return adjust(pvalues, method, groups, lam) <= Q
@@ -0,0 +1,985 @@
+"""
+Program: KLEngine.py
+
+Purpose: Vectorized Kullback-Leibler divergence (KLD) scoring of the Mok et al kinase
+         PWMs against module PWMs.
+
+         KLD(X,Y) = E Xalog(Xa/Ya) + E Yalog(Ya/Xa)
+
+         summed over every amino acid a and every position of the PWM.  This is the
+         same score kullback-Leibler.py has always reported (the 1/2 is not applied).
+
+         Every PWM is held as a row of a numpy array with shape (n_pwm, 20, w), the
+         rows ordered by amino acid (AminoList) and the columns by PWM position.  The
+         width w comes from the PWM files (13 for the Mok PWMs, any odd width works);
+         when the kinase and module PWMs differ in width both are aligned on their
+         central residue and cut to the narrower width.
+         Because  Xalog(Xa/Ya) + Yalog(Ya/Xa) = (Xa - Ya)(log Xa - log Ya)  the full
+         kinase x module score matrix reduces to a handful of matrix products:
+
+         KLD(X,Y) = E XalogXa + E YalogYa - E XalogYa - E YalogXa
+
+         The first two terms are computed once per PWM, the last two are a single
+         (n_kinase, 20w) x (20w, n_module) product each.
+
+Input  : PWMs as PWMRegistry objects, or anything PWMRegistry.load accepts: a DataFrame
+         in the PWM csv format (Motif,AA,0,1,2,...,w-1), a csv file, a directory of csv
+         files or a .npz PWM bundle.
+
+Output : numpy array of scores, rows are kinases, columns are modules.
+
+Library: the pipeline can run in-process, i.e. from the notebook, without the command
+         line scripts re-reading every file:
+
+             import KLEngine as kle
+             scores = kle.score_matrix('Mok_kinase_PWMs/', 'position_weight_matrix.txt')
+             null   = kle.null_distribution('Mok_kinase_PWMs/', 'position_weight_matrix.txt', 1000, seed, procs=4)
+             table  = kle.fdr('Mok_kinase_PWMs/', 'position_weight_matrix.txt', null)
+
+         fdr(..., correction='bh') adds Adjusted_FDR, the FDRs corrected per module for the
+         number of kinases tested (FDRCorrection.py, also bh / by / storey).
+
+         Load the PWMs once with PWMRegistry.load and pass the registries to skip the
+         csv parsing on every call.
+
+         Shuffled (null) scores may be kept in a binary store, see ScoreStore:
+             null_scores.npy   float32 array (n_kinase, n_module, iterations)
+             null_scores.json  manifest, kinase and module names, iterations and seed
+"""
+import hashlib
+import json
+import multiprocessing
+import numpy as np
+import os
+import pandas as pd
+import FDRCorrection as fc
+import PWMRegistry as pwr
+from scipy.stats import gamma
+import time
+
+# columns of the fdrTable result
+FdrColumns = ['Scores', 'Kinase', 'Module', 'Counts_Less_Than', 'Number_of_Scores', 'FDR']
+
+# number of shuffles drawn from one random stream, fixed so results do not depend on process count
+BlockSize = 100
+
+# shuffle algorithm tag, part of every ShuffleCache key; change it whenever blockRng,
+# shuffleIndex or flatIndex draw different shuffles for the same seed
+ShuffleVersion = 'pcg64-seedseq-argsort-v1'
+
+# blocks written between ShuffleCache prunes
+PruneEvery = 100
+
+
+def newSeed():
+    """ Return a fresh random seed (a large integer) to use when the user did not supply one """
+    return np.random.SeedSequence().entropy
+
+
+def iterationBlocks(iterations, blockSize=BlockSize):
+    """ Split the total number of shuffles into (block, size) pieces of at most blockSize.
+    Blocks depend only on the iteration count, never on how the work is distributed. """
+    return [ (block, min(blockSize, iterations - start))
+             for block, start in enumerate(range(0, iterations, blockSize)) ]
+
+
+def blockRng(seed, kinaseIdx, block):
+    """ Independent random Generator for one block of shuffles of one kinase.  Each
+    (kinase, block) pair gets its own SeedSequence child of the run seed, so any worker
+    can draw any block and the same seed always produces the same shuffles. """
+    return np.random.Generator(np.random.PCG64(np.random.SeedSequence(seed, spawn_key=(kinaseIdx, block))))
+
+
+def shuffleIndex(N, rows, width, rng=np.random):
+    """ Draw N independent shuffles of a (rows, width) PWM as index arrays.
+    Returns rowIdx (N, rows, width), the row permutation used within each column,
+    and colIdx (N, 1, width), the permutation of the columns themselves. """
+    rowIdx = np.argsort(rng.random((N, rows, width)), axis=1)
+    colIdx = np.argsort(rng.random((N, width)), axis=1)[:, None, :]
+    return rowIdx, colIdx
+
+
+def flatIndex(rowIdx, colIdx):
+    """ Combine shuffleIndex output into one (N, rows, width) index into a flattened PWM,
+    pwm.ravel()[flat] is the shuffled PWMs.  Shuffles are permutations, so the same index
+    applied to the precomputed log2 PWM gives the logs of the shuffled PWMs. """
+    return (rowIdx * rowIdx.shape[2] + colIdx).astype(np.int16)
+
+
+def shufflePWM(pwm, N, rng=np.random):
+    """ Return N shuffled copies (N, 20, w) of a single (20, w) PWM.  Rows are shuffled
+    within each column and the columns are then shuffled, as the original Shuffle() did. """
+    rowIdx, colIdx = shuffleIndex(N, pwm.shape[0], pwm.shape[1], rng)
+    return pwm[rowIdx, colIdx]
+
+
+class ShuffleCache(object):
+    """ Persistent disk cache of kinase PWM shuffle blocks.
+
+    The Mok kinase PWMs never change between experiments, only the module PWMs do, so with a
+    fixed seed the shuffles of the kinase PWMs can be reused by every later run.  A block is
+    kept as its flat shuffle index (int16, see flatIndex), which applies to the PWM and to its
+    precomputed logs alike.  Each block is stored as <key>.npy where the key is a sha256 of
+    ShuffleVersion, the PWM shape, a sha256 of the PWM bytes, seed, kinase index, block and
+    block size.  The index itself only depends on the shape, but keying on the PWM values as
+    well means an edited kinase PWM file (or a different pseudocount) never reuses blocks
+    cached for the old PWM.  A change to blockRng, shuffleIndex or flatIndex must change
+    ShuffleVersion, which retires every block drawn the old way.  Reading a block refreshes
+    its modification time and prune() removes the least recently used blocks until the
+    cache fits in maxBytes.  Workers only get and put blocks, the single writer of a run
+    calls written() as blocks come back, which prunes every pruneEvery blocks.
+
+    Attributes:
+        cacheDir   - cache directory, created if missing
+        maxBytes   - size limit applied by prune()
+        pruneEvery - blocks written between prunes, see written()
+        pending    - blocks written since the last prune
+    """
+
+    def __init__(self, cacheDir, maxBytes, pruneEvery=PruneEvery):
+        self.cacheDir   = cacheDir
+        self.maxBytes   = maxBytes
+        self.pruneEvery = pruneEvery
+        self.pending    = 0
+        os.makedirs(cacheDir, exist_ok=True)
+
+    def key(self, pwm, seed, kIdx, block, size):
+        """ Cache key for one block of shuffles of one (20, w) kinase PWM """
+        pwm    = np.ascontiguousarray(pwm)
+        digest = hashlib.sha256(('%s,index,%d,%d' %((ShuffleVersion,) + tuple(pwm.shape))).encode())
+        digest.update(hashlib.sha256(pwm.tobytes()).digest())
+        digest.update(('%d,%d,%d,%d,%d' %(seed, kIdx, block, size, BlockSize)).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """ Return the cached shuffle index for key, or None """
+        path = os.path.join(self.cacheDir, key + '.npy')
+        try:
+            arr = np.load(path)
+        except (IOError, OSError, ValueError):
+            return None
+        try:
+            os.utime(path, None)                               # mark as recently used
+        except OSError:                                        # pruned since it was read
+            pass
+        return arr
+
+    def put(self, key, arr):
+        """ Store a shuffle index, written to a temporary file first so readers never see a partial file """
+        path = os.path.join(self.cacheDir, key + '.npy')
+        tmp  = '%s.%d.tmp' %(path, os.getpid())
+        with open(tmp, 'wb') as out:
+            np.save(out, arr)
+        os.replace(tmp, path)
+
+    def prune(self):
+        """ Delete least recently used blocks until the cache is no larger than maxBytes """
+        files = [ os.path.join(self.cacheDir, f) for f in os.listdir(self.cacheDir) if f.endswith('.npy') ]
+        files = sorted(files, key=os.path.getmtime)            # oldest first
+        total = sum(os.path.getsize(f) for f in files)
+        for f in files:
+            if total <= self.maxBytes:
+                break
+            try:
+                size = os.path.getsize(f)
+                os.remove(f)
+            except OSError:                                    # replaced or removed meanwhile
+                continue
+            total -= size
+
+    def written(self, blocks=1):
+        """ Count blocks of shuffles written by the run and prune once pruneEvery have been
+        written since the last prune, so a long run never grows the cache far past maxBytes.
+        Called from the single writer process, never from the Pool workers. """
+        self.pending += blocks
+        if self.pending >= self.pruneEvery:
+            self.prune()
+            self.pending = 0
+
+
+def blockIndex(pwm, seed, kIdx, block, size, cache=None):
+    """ Flat shuffle index (size, 20, w) of one block of shuffles of one (20, w) kinase PWM,
+    see flatIndex.  Taken from the ShuffleCache when it holds it. """
+    if cache is not None:
+        key   = cache.key(pwm, seed, kIdx, block, size)
+        index = cache.get(key)
+        if index is not None:
+            return index
+    index = flatIndex(*shuffleIndex(size, pwm.shape[0], pwm.shape[1], blockRng(seed, kIdx, block)))
+    if cache is not None:
+        cache.put(key, index)
+    return index
+
+
+def blockShuffle(pwm, seed, kIdx, block, size, cache=None):
+    """ Shuffled copies (size, 20, w) of one kinase PWM for one block """
+    return pwm.ravel()[blockIndex(pwm, seed, kIdx, block, size, cache)]
+
+
+def klMetric(X, Y, logX, logY, WX):
+    """ Symmetric KLD, E (Xa - Ya)(logXa - logYa) over every amino acid and position """
+    X, Y, logX, logY = [ a.reshape(a.shape[0], -1) for a in (X, Y, logX, logY) ]
+    selfX = (X * logX).sum(axis=1)                 # E XalogXa for each PWM in X
+    selfY = (Y * logY).sum(axis=1)                 # E YalogYa for each PWM in Y
+    return selfX[:, None] + selfY[None, :] - X.dot(logY.T) - logX.dot(Y.T)
+
+
+def icklWeights(information):
+    """ ickl weights (n, w) from PWMRegistry information weights (n, w), scaled so every
+    PWM's weights average 1 over its positions, keeping ickl scores on the kl scale.  The
+    Mok IC_Final weights are ~0.96 at the central residue and below 0.01 elsewhere, so the
+    scaled Mok weights are ~12 at the centre and ~0.01 at the flanks: ickl on the Mok
+    PWMs scores the phosphoacceptor position almost alone.  A PWM without information
+    (every weight 0) gets weight 1 everywhere, plain kl. """
+    information = np.asarray(information, dtype=np.float64)
+    mean = information.mean(axis=1, keepdims=True)
+    return np.divide(information, mean, out=np.ones_like(information), where=mean > 0)
+
+
+def icklMetric(X, Y, logX, logY, WX):
+    """ Information weighted KLD, E Wa (Xa - Ya)(logXa - logYa) where W holds the information
+    weight of the X position each value came from (it moves with the shuffled columns) """
+    X, Y, logX, logY, WX = [ a.reshape(a.shape[0], -1) for a in (X, Y, logX, logY, WX) ]
+    selfX = (WX * X * logX).sum(axis=1)
+    return selfX[:, None] + WX.dot((Y * logY).T) - (WX * X).dot(logY.T) - (WX * logX).dot(Y.T)
+
+
+def jsMetric(X, Y, logX, logY, WX):
+    """ Jensen-Shannon divergence summed over positions, 1/2 E XalogXa + 1/2 E YalogYa - E MalogMa
+    with M = (X + Y) / 2.  M depends on both PWMs, it is formed for ChunkSize values at a time. """
+    X, Y, logX, logY = [ a.reshape(a.shape[0], -1) for a in (X, Y, logX, logY) ]
+    scores = 0.5 * ((X * logX).sum(axis=1)[:, None] + (Y * logY).sum(axis=1)[None, :])
+    step   = max(1, ChunkSize // X.size)
+    for start in range(0, Y.shape[0], step):
+        M = 0.5 * (X[:, None, :] + Y[None, start:start + step, :])
+        scores[:, start:start + step] -= (M * np.log2(M)).sum(axis=2)
+    return scores
+
+
+def standardColumns(pwm):
+    """ Centre every PWM column (amino acids) and scale it to unit length.  Returns the
+    scaled PWMs, columns without variance (all 0.05) set to 0, and an (n, w) array that
+    is 1 for those flat columns. """
+    centred = pwm - pwm.mean(axis=1, keepdims=True)
+    norm    = np.sqrt((centred**2).sum(axis=1, keepdims=True))
+    flat    = norm <= 1e-12
+    return np.divide(centred, norm, out=np.zeros_like(centred), where=~flat), flat[:, 0, :].astype(np.float64)
+
+
+def pearsonMetric(X, Y, logX, logY, WX):
+    """ E (1 - r) over positions, r the Pearson correlation of the amino acid frequencies of
+    an X column and the matching Y column.  0 for identical PWMs.  Two flat columns (no
+    variance) have r = 1, a flat column against any other r = 0. """
+    Xn, flatX = standardColumns(X)
+    Yn, flatY = standardColumns(Y)
+    return X.shape[2] - Xn.reshape(X.shape[0], -1).dot(Yn.reshape(Y.shape[0], -1).T) - flatX.dot(flatY.T)
+
+
+def ssdMetric(X, Y, logX, logY, WX):
+    """ Sum of squared differences, E (Xa - Ya)^2 over every amino acid and position """
+    X = X.reshape(X.shape[0], -1)
+    Y = Y.reshape(Y.shape[0], -1)
+    return (X**2).sum(axis=1)[:, None] + (Y**2).sum(axis=1)[None, :] - 2.0 * X.dot(Y.T)
+
+
+# PWM comparison metrics, every one is a distance summed over positions, 0 for identical PWMs
+Metrics    = { 'kl'      : klMetric,
+               'ickl'    : icklMetric,
+               'js'      : jsMetric,
+               'pearson' : pearsonMetric,
+               'ssd'     : ssdMetric }
+LogMetrics = ('kl', 'ickl', 'js')                  # metrics using the log2 PWMs
+
+# number of values jsMetric forms at once, bounds its memory to a few 100 MB
+ChunkSize = 2**22
+
+
+def pwmScore(X, Y, metric='kl', maxShift=0, logX=None, logY=None, WX=None, windows=None):
+    """ Compare every PWM in X (k, 20, w) with every PWM in Y (m, 20, w) using one of Metrics.
+    Returns a (k, m) array, lower is more alike.  logX and logY are the log2 of X and Y,
+    pass them when they are already known (see KLEngine) so no log is taken here.  WX
+    (k, 20, w) holds the information weights of X, needed by ickl only.  With maxShift > 0
+    the best score over every offset up to maxShift positions is returned, see pwmOffset
+    (windows are its precomputed Y windows). """
+    if metric in LogMetrics:
+        if logX is None:
+            logX = np.log2(X)
+        if logY is None:
+            logY = np.log2(Y)
+    if maxShift:
+        return pwmOffset(X, Y, maxShift, metric, logX, logY, WX, windows)[0]
+    return Metrics[metric](X, Y, logX, logY, WX)
+
+
+def offsetWindows(Y, logY, maxShift):
+    """ The Y side of every pwmOffset shift, dict shift -> (Y, logY) column windows as
+    contiguous (m, 20, overlap) arrays, logY None when not given.  Build them once for a
+    fixed set of PWMs (KLEngine modules) instead of slicing and copying on every call. """
+    width   = Y.shape[2]
+    windows = {}
+    for shift in range(-maxShift, maxShift + 1):
+        cols = slice(max(0, shift), max(0, shift) + width - abs(shift))
+        windows[shift] = (np.ascontiguousarray(Y[:, :, cols]), None if logY is None else np.ascontiguousarray(logY[:, :, cols]))
+    return windows
+
+
+def pwmOffset(X, Y, maxShift, metric='kl', logX=None, logY=None, WX=None, windows=None):
+    """ Sliding offset comparison.  For every shift s in -maxShift ... maxShift position i of
+    X is compared with position i + s of Y over the positions the two PWMs share.  Each
+    shift is one pwmScore call on column slices, so all pairs are scored at once.  The sum
+    over the overlap is scaled by w / overlap, keeping shifted scores on the same scale
+    as the fixed alignment (shift 0 is exactly pwmScore).
+
+    Every score costs 2 maxShift + 1 comparisons, there is no early exit.  The logs are
+    taken once, not per shift; windows (see offsetWindows) supplies the Y side of every
+    shift ready made, so only X is sliced here.
+
+    Returns (scores, offsets), (k, m) arrays of the lowest score over all shifts and
+    the shift giving it. """
+    if metric in LogMetrics:
+        if logX is None:
+            logX = np.log2(X)
+        if logY is None and windows is None:
+            logY = np.log2(Y)
+    cut   = lambda a, cols: None if a is None else a[:, :, cols]
+    width = X.shape[2]
+    if maxShift < 0:
+        raise ValueError('Shift %d is negative, use 0 to %d' %(maxShift, width - 1))
+    if maxShift >= width:
+        raise ValueError('Shift %d leaves no overlap between width %d PWMs' %(maxShift, width))
+    best    = np.full((X.shape[0], Y.shape[0]), np.inf)
+    offsets = np.zeros(best.shape, dtype=np.int64)
+    for shift in sorted(range(-maxShift, maxShift + 1), key=abs):       # ties keep the smallest shift
+        overlap = width - abs(shift)
+        xStart  = max(0, -shift)
+        yStart  = max(0, shift)
+        xCols   = slice(xStart, xStart + overlap)
+        yCols   = slice(yStart, yStart + overlap)
+        yWin, logYWin = windows[shift] if windows is not None else (Y[:, :, yCols], cut(logY, yCols))
+        scores  = pwmScore(X[:, :, xCols], yWin, metric, 0, cut(logX, xCols), logYWin,
+                           cut(WX, xCols)) * width / float(overlap)
+        better  = scores < best
+        best[better]    = scores[better]
+        offsets[better] = shift
+    return best, offsets
+
+
+def klScore(X, Y, maxShift=0, logX=None, logY=None):
+    """ Symmetric KLD between every PWM in X (k, 20, w) and every PWM in Y (m, 20, w),
+    pwmScore with the kl metric.  Returns a (k, m) array. """
+    return pwmScore(X, Y, 'kl', maxShift, logX, logY)
+
+
+def klOffset(X, Y, maxShift, logX=None, logY=None):
+    """ Sliding offset KLD, pwmOffset with the kl metric.  Returns (scores, offsets). """
+    return pwmOffset(X, Y, maxShift, 'kl', logX, logY)
+
+
+# binary score store file names, written to the kullback-Leibler.py output directory
+StoreArray    = 'null_scores.npy'
+StoreManifest = 'null_scores.json'
+
+# finished units of a shuffle run, written to the output directory so killed runs can resume
+CheckpointFile = 'checkpoint.json'
+
+# scores of one shard of a run split over cluster jobs, see ShardStore and mergeShards
+ShardArray    = 'shard_scores.npy'
+ShardManifest = 'shard_scores.json'
+
+# per process state for multiprocessing Pool workers, filled once by initWorker
+workerState = {}
+
+
+def shuffleTasks(nKinase, iterations):
+    """ List every (kinaseIdx, block, size) unit of shuffle work.  Tasks are ordered by
+    kinase then block, which is the order scores are written out. """
+    return [ (kIdx, block, size) for kIdx in range(nKinase) for block, size in iterationBlocks(iterations) ]
+
+
+def shardTasks(nKinase, iterations, shard=0, nShards=1):
+    """ The tasks of shard (0 based) of nShards, every nShards'th task of shuffleTasks so
+    each shard gets a similar mix of kinases.  Each task draws from its own (seed, kinase,
+    block) random stream, merged shards hold exactly the scores of an unsharded run. """
+    return shuffleTasks(nKinase, iterations)[shard::nShards]
+
+
+def initWorker(engine, seed, observed=None, cache=None):
+    """ Pool initializer, keeps the KLEngine (PWMs, their logs and weights, metric and offset
+    window), run seed, (for adaptive runs) the unshuffled (n_kinase, n_module) scores and an
+    optional ShuffleCache in each worker process """
+    workerState['engine']   = engine
+    workerState['seed']     = seed
+    workerState['observed'] = observed
+    workerState['cache']    = cache
+
+
+def scoreBlock(task):
+    """ Pool task, shuffle one kinase PWM for one block and score against every module.
+    task is (kinaseIdx, block, size), returns (kinaseIdx, block, scores, stats) where scores
+    is a (size, n_module) array and stats is (pid, shuffle seconds, score seconds). """
+    kIdx, block, size = task
+    engine = workerState['engine']
+    start  = time.time()
+    index  = blockIndex(engine.kinasePWM[kIdx], workerState['seed'], kIdx, block, size, workerState['cache'])
+    middle = time.time()
+    scores = engine.scoreShuffled(kIdx, index)
+    return kIdx, block, scores, (os.getpid(), middle - start, time.time() - middle)
+
+
+def wilsonInterval(counts, draws, z):
+    """ Wilson score confidence interval for the proportion counts/draws, z is the normal
+    quantile for the confidence level.  Returns (lower, upper) arrays. """
+    p      = counts / draws
+    denom  = 1.0 + z**2 / draws
+    centre = (p + z**2 / (2.0 * draws)) / denom
+    half   = z * np.sqrt(p * (1.0 - p) / draws + z**2 / (4.0 * draws**2)) / denom
+    return centre - half, centre + half
+
+
+def adaptiveKinase(task):
+    """ Pool task, adaptive Monte-Carlo p-values for one kinase against every module.
+
+    task is (kinaseIdx, threshold, maxIterations, z).  Shuffle blocks are drawn in the same
+    order, from the same random streams, as a fixed run.  After each block the p-value of
+    every pair (fraction of shuffled scores below the unshuffled score) gets a Wilson
+    interval; pairs whose interval no longer contains threshold are decided and are not
+    scored again.  Stops when every pair is decided or maxIterations is reached.  z is
+    checked at every block, the caller widens it for the number of looks (runAdaptive).
+
+    Returns (kinaseIdx, counts, draws, undecided, stats), arrays over modules holding the
+    number of shuffled scores below the unshuffled score, the number of shuffles used and
+    whether the pair was still undecided at the end, and (pid, shuffle seconds, score
+    seconds).
+    """
+    kIdx, threshold, maxIter, z = task
+    observed  = workerState['observed'][kIdx]
+    counts    = np.zeros(len(observed), dtype=np.int64)
+    draws     = np.zeros(len(observed), dtype=np.int64)
+    undecided = np.ones(len(observed), dtype=bool)
+    engine    = workerState['engine']
+    timing    = [0.0, 0.0]
+    for block, size in iterationBlocks(maxIter):
+        idx = np.flatnonzero(undecided)
+        if not len(idx):
+            break
+        start  = time.time()
+        index  = blockIndex(engine.kinasePWM[kIdx], workerState['seed'], kIdx, block, size, workerState['cache'])
+        middle = time.time()
+        scores = engine.scoreShuffled(kIdx, index, idx)                            # only the undecided modules
+        timing[0] += middle - start
+        timing[1] += time.time() - middle
+        counts[idx] += (scores < observed[idx]).sum(axis=0)
+        draws[idx]  += size
+        lower, upper = wilsonInterval(counts[idx], draws[idx], z)
+        undecided[idx] = (lower <= threshold) & (upper >= threshold)
+    return kIdx, counts, draws, undecided, (os.getpid(), timing[0], timing[1])
+
+
+def fitGamma(samples):
+    """ Moment-matched gamma fit along the first axis of samples (shuffles x ...).
+    Returns (shape, scale) arrays with the remaining dimensions.  Degenerate samples, all
+    equal (variance 0) or with a mean <= 0, have no gamma fit and get NaN shape and scale. """
+    mean = samples.mean(axis=0)
+    var  = samples.var(axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shape, scale = mean**2 / var, var / mean
+    bad = ~((var > 0) & (mean > 0) & np.isfinite(shape) & np.isfinite(scale))
+    return np.where(bad, np.nan, shape), np.where(bad, np.nan, scale)
+
+
+class KLEngine(object):
+    """ Holds the kinase and module PWMs as aligned arrays and scores them against each other
+    with one of the Metrics, the symmetric KLD by default.
+
+    Attributes:
+        kinases   - list of kinase names, in the same order as kinasePWM
+        kinasePWM - numpy array (n_kinase, 20, w) of kinase PWMs
+        modules   - list of module names, in the same order as modulePWM
+        modulePWM - numpy array (n_module, 20, w) of module PWMs
+        kinaseLog - log2 of kinasePWM, taken once
+        moduleLog - log2 of modulePWM, taken once
+        kinaseWeight - ickl weight of every kinase PWM value (n_kinase, 20, w), see icklWeights
+        width     - number of PWM positions w compared, the narrower of the two PWM sets
+        maxShift  - offset search window, 0 compares position for position only
+        moduleWindows - module PWMs and logs cut for every shift (offsetWindows), None without maxShift
+        metric    - name of the comparison metric, a key of Metrics
+    """
+
+    def __init__(self, kinases, modules, maxShift=0, pseudocount=0, metric='kl'):
+        """ Construct KLEngine from the kinase and module PWMs, see PWMRegistry.load.
+        PWM sets of different widths are aligned on the central residue.  With maxShift
+        every score, shuffled or not, is the best over offsets up to maxShift (pwmOffset).
+        A pseudocount smooths PWMs holding zero frequencies, see PWMRegistry. """
+        if metric not in Metrics:
+            raise ValueError('Unknown metric %s, use one of %s' %(metric, ', '.join(sorted(Metrics))))
+        kinases = pwr.load(kinases, pseudocount=pseudocount)
+        modules = pwr.load(modules, pseudocount=pseudocount)
+        self.width = min(kinases.width, modules.width)
+        if not 0 <= maxShift < self.width:
+            raise ValueError('Shift %d is outside 0 to %d for width %d PWMs' %(maxShift, self.width - 1, self.width))
+        kinases, modules = kinases.crop(self.width), modules.crop(self.width)
+        self.maxShift = maxShift
+        self.metric   = metric
+        self.kinases, self.kinasePWM = kinases.names, kinases.pwm
+        self.modules, self.modulePWM = modules.names, modules.pwm
+        self.kinaseLog = np.log2(self.kinasePWM)
+        self.moduleLog = np.log2(self.modulePWM)
+        self.kinaseWeight = np.ascontiguousarray(np.broadcast_to(icklWeights(kinases.information)[:, None, :], self.kinasePWM.shape))
+        self.moduleWindows = offsetWindows(self.modulePWM, self.moduleLog, maxShift) if maxShift else None
+
+    def score(self, kinasePWM=None, kinaseLog=None, kinaseWeight=None):
+        """ Return the (n_kinase, n_module) score matrix.  Optionally score a different
+        set of kinase PWMs (for example shuffled copies, with their logs and information
+        weights when known) against the modules. """
+        if kinasePWM is None:
+            kinasePWM, kinaseLog, kinaseWeight = self.kinasePWM, self.kinaseLog, self.kinaseWeight
+        return pwmScore(kinasePWM, self.modulePWM, self.metric, self.maxShift, kinaseLog, self.moduleLog, kinaseWeight,
+                        self.moduleWindows)
+
+    def scoreShuffled(self, kIdx, index, moduleIdx=None):
+        """ Score shuffled copies of one kinase PWM, index is a flat shuffle index (see
+        blockIndex) applied to the PWM, its logs and weights alike.  Returns (N, n_module)
+        scores, or only the modules in moduleIdx. """
+        modules = slice(None) if moduleIdx is None else moduleIdx
+        windows = self.moduleWindows
+        if windows is not None and moduleIdx is not None:
+            windows = { shift : (Y[modules], None if logY is None else logY[modules]) for shift, (Y, logY) in windows.items() }
+        return pwmScore(self.kinasePWM[kIdx].ravel()[index], self.modulePWM[modules], self.metric, self.maxShift,
+                        self.kinaseLog[kIdx].ravel()[index], self.moduleLog[modules], self.kinaseWeight[kIdx].ravel()[index],
+                        windows)
+
+    def offsets(self):
+        """ Return the (n_kinase, n_module) best offsets of the unshuffled PWMs, the module
+        position aligned with kinase position i is i + offset. """
+        return pwmOffset(self.kinasePWM, self.modulePWM, self.maxShift, self.metric,
+                         self.kinaseLog, self.moduleLog, self.kinaseWeight, self.moduleWindows)[1]
+
+    def nullScores(self, kinase, N, rng=np.random):
+        """ Shuffle one kinase PWM N times and score every shuffled copy against every
+        module.  kinase is the kinase name or its index, returns an (N, n_module) array. """
+        if not isinstance(kinase, int):
+            kinase = self.kinases.index(kinase)
+        return self.score(shufflePWM(self.kinasePWM[kinase], N, rng))
+
+    def sampleNull(self, kinase, N, seed, cache=None):
+        """ Shuffled scores (N, n_module) for one kinase drawn from the seeded block streams,
+        the same shuffles a fixed run with N iterations would use.  kinase is an index. """
+        pwm = self.kinasePWM[kinase]
+        return np.concatenate([ self.scoreShuffled(kinase, blockIndex(pwm, seed, kinase, block, size, cache))
+                                for block, size in iterationBlocks(N) ])
+
+    def approxFDR(self, N, seed, threshold, cache=None):
+        """ Approximate FDR from a moment-matched gamma null, for screening before a full shuffle.
+
+        Each kinase is shuffled only N times, a gamma is fitted to the shuffled scores of every
+        kinase-module pair and a module's null CDF is the mean of its kinases' gamma CDFs (the
+        exact FDR pools every kinase's shuffles for the module in the same way).  Pairs whose
+        shuffled scores cannot be fitted (all equal, see fitGamma) use the empirical CDF of
+        their own shuffled scores instead of a gamma.
+
+        Returns a DataFrame with, for every kinase-module pair:
+            Scores      - unshuffled score
+            FDR_Approx  - FDR from the fitted gamma null
+            FDR_Sample  - FDR from the N x n_kinase shuffled scores themselves
+            Std_Error   - binomial standard error of FDR_Sample
+            KS          - Kolmogorov-Smirnov distance between the module's gamma null and its sample
+            Borderline  - 1 when FDR_Approx is within KS + 2 * Std_Error of threshold, these
+                          pairs should be confirmed with a full shuffle
+        """
+        samples = np.stack([ self.sampleNull(kIdx, N, seed, cache) for kIdx in range(len(self.kinases)) ], axis=1)  # (N, n_kinase, n_module)
+        shape, scale = fitGamma(samples)                                             # (n_kinase, n_module)
+        empirical    = np.isnan(shape)                                               # pairs without a gamma fit
+        observed = self.score()
+        frames   = []
+        for idx, module in enumerate(self.modules):
+            pooled = np.sort(samples[:, :, idx].ravel())
+
+            def mixCDF(x):
+                cdf = gamma.cdf(x[:, None], shape[:, idx], scale=scale[:, idx])
+                for kIdx in np.flatnonzero(empirical[:, idx]):
+                    cdf[:, kIdx] = np.searchsorted(np.sort(samples[:, kIdx, idx]), x, side='right') / float(N)
+                return cdf.mean(axis=1)
+            ecdf   = np.arange(1, len(pooled) + 1) / float(len(pooled))
+            fitted = mixCDF(pooled)
+            ks     = max(np.abs(fitted - ecdf).max(), np.abs(fitted - ecdf + 1.0 / len(pooled)).max())
+            approx = mixCDF(observed[:, idx])
+            sample = np.searchsorted(pooled, observed[:, idx], side='left') / float(len(pooled))
+            stdErr = np.sqrt(sample * (1.0 - sample) / len(pooled))
+            frames.append(pd.DataFrame({ 'Kinase'     : self.kinases,
+                                         'Module'     : module,
+                                         'Scores'     : observed[:, idx],
+                                         'FDR_Approx' : approx,
+                                         'FDR_Sample' : sample,
+                                         'Std_Error'  : stdErr,
+                                         'KS'         : ks,
+                                         'Borderline' : (np.abs(approx - threshold) <= ks + 2 * stdErr).astype(int) }))
+        return pd.concat(frames, ignore_index=True)
+
+    def scoreTable(self):
+        """ Return the score matrix as a long DataFrame with columns Scores, Kinase, Module,
+        plus Offset when the engine searches offsets """
+        scores = self.score()
+        table  = pd.DataFrame({ 'Scores' : scores.ravel(),
+                                'Kinase' : np.repeat(self.kinases, len(self.modules)),
+                                'Module' : np.tile(self.modules, len(self.kinases)) })
+        if self.maxShift:
+            table['Offset'] = self.offsets().ravel()
+        return table
+
+
+class ScoreStore(object):
+    """ Binary, memory-mappable store for shuffled KL scores.
+
+    Scores are held in a float32 .npy file indexed kinase x module x iteration, next to a
+    small JSON manifest.  Blocks of scores can be written in any order.
+
+    Attributes:
+        outDir     - output directory
+        manifest   - dict with kinases, modules, iterations, seed, blockSize, dtype and shape
+        scores     - numpy memmap (n_kinase, n_module, iterations)
+    """
+
+    def __init__(self, outDir, kinases, modules, iterations, seed, blockSize=BlockSize, resume=False):
+        """ Create the store, the .npy file is allocated on disk immediately.  With resume the
+        existing .npy file of an interrupted run is reopened and its scores are kept. """
+        self.outDir   = outDir
+        self.manifest = { 'kinases'    : list(kinases),
+                          'modules'    : list(modules),
+                          'iterations' : iterations,
+                          'seed'       : seed,
+                          'blockSize'  : blockSize,
+                          'dtype'      : 'float32',
+                          'shape'      : [len(kinases), len(modules), iterations],
+                          'array'      : StoreArray }
+        path          = os.path.join(outDir, StoreArray)
+        if resume and os.path.exists(path):
+            self.scores = np.lib.format.open_memmap(path, mode='r+')
+            if self.scores.shape != tuple(self.manifest['shape']):
+                raise ValueError('%s has shape %s, expected %s' %(path, self.scores.shape, tuple(self.manifest['shape'])))
+        else:
+            self.scores = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                                    shape=tuple(self.manifest['shape']))
+
+    def write(self, kIdx, block, scores):
+        """ Store one block of scores, scores is (size, n_module) as returned by scoreBlock """
+        start = block * self.manifest['blockSize']
+        self.scores[kIdx, :, start:start + scores.shape[0]] = scores.T
+
+    def sync(self):
+        """ Flush the written blocks to disk, called before a checkpoint """
+        self.scores.flush()
+        return None
+
+    def close(self):
+        """ Flush the array to disk and write the manifest """
+        self.scores.flush()
+        del self.scores
+        with open(os.path.join(self.outDir, StoreManifest), 'w') as out:
+            json.dump(self.manifest, out, indent=1)
+
+
+class ShardStore(object):
+    """ Binary store for the scores of one shard of a shuffle run (see shardTasks), combined
+    with the other shards into a ScoreStore by mergeShards.
+
+    Scores are held in a float32 .npy file, one row per shuffle of the shard's tasks (in task
+    order) and one column per module, next to a JSON manifest that also records the run
+    parameters so mergeShards can check the shards belong together.
+
+    Attributes:
+        outDir     - shard output directory
+        manifest   - dict with kinases, modules, iterations, seed, blockSize, shard, nShards,
+                     params (the checkpoint parameters of the run), dtype, shape and tasks
+        rows       - dict, (kinaseIdx, block) -> first row of the task
+        scores     - numpy memmap (shuffles in the shard, n_module)
+    """
+
+    def __init__(self, outDir, kinases, modules, iterations, seed, shard, nShards, params=None, resume=False):
+        tasks         = shardTasks(len(kinases), iterations, shard, nShards)
+        self.outDir   = outDir
+        self.rows     = {}
+        nRows         = 0
+        for kIdx, block, size in tasks:
+            self.rows[(kIdx, block)] = nRows
+            nRows += size
+        self.manifest = { 'kinases'    : list(kinases),
+                          'modules'    : list(modules),
+                          'iterations' : iterations,
+                          'seed'       : seed,
+                          'blockSize'  : BlockSize,
+                          'shard'      : shard,
+                          'nShards'    : nShards,
+                          'params'     : params,
+                          'dtype'      : 'float32',
+                          'shape'      : [nRows, len(modules)],
+                          'tasks'      : tasks,
+                          'array'      : ShardArray }
+        path          = os.path.join(outDir, ShardArray)
+        if resume and os.path.exists(path):
+            self.scores = np.lib.format.open_memmap(path, mode='r+')
+            if self.scores.shape != tuple(self.manifest['shape']):
+                raise ValueError('%s has shape %s, expected %s' %(path, self.scores.shape, tuple(self.manifest['shape'])))
+        else:
+            self.scores = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                                    shape=tuple(self.manifest['shape']))
+
+    def write(self, kIdx, block, scores):
+        """ Store one block of scores, scores is (size, n_module) as returned by scoreBlock """
+        start = self.rows[(kIdx, block)]
+        self.scores[start:start + scores.shape[0]] = scores
+
+    def sync(self):
+        """ Flush the written blocks to disk, called before a checkpoint """
+        self.scores.flush()
+        return None
+
+    def close(self):
+        """ Flush the array to disk and write the manifest """
+        self.scores.flush()
+        del self.scores
+        with open(os.path.join(self.outDir, ShardManifest), 'w') as out:
+            json.dump(self.manifest, out, indent=1)
+
+
+def mergeShards(shardDirs, outDir):
+    """ Check the ShardStores in shardDirs and combine them into one ScoreStore in outDir.
+
+    The shards must be finished (checkComplete), come from runs with the same parameters and
+    number of shards, and hold every shard exactly once.  Raises ValueError otherwise.
+    Returns the manifest of the merged store. """
+    manifests = []
+    for shardDir in shardDirs:
+        checkComplete(shardDir)
+        path = os.path.join(shardDir, ShardManifest)
+        if not os.path.exists(path):
+            raise ValueError('%s holds no shard store (%s)' %(shardDir, ShardManifest))
+        with open(path, 'r') as f:
+            manifests.append(json.load(f))
+    if not manifests:
+        raise ValueError('no shards to merge')
+
+    first   = manifests[0]
+    nShards = first['nShards']
+    for manifest in manifests:
+        manifest['run'] = { key : value for key, value in (manifest['params'] or {}).items() if key != 'shard' }
+    for shardDir, manifest in zip(shardDirs, manifests):
+        for key in ('kinases', 'modules', 'iterations', 'seed', 'blockSize', 'nShards', 'run'):
+            if manifest[key] != first[key]:
+                raise ValueError('%s has a different %s than %s' %(shardDir, 'run setting' if key == 'run' else key, shardDirs[0]))
+        expected = shardTasks(len(manifest['kinases']), manifest['iterations'], manifest['shard'], nShards)
+        if [ tuple(task) for task in manifest['tasks'] ] != expected:
+            raise ValueError('%s does not hold the tasks of shard %d of %d' %(shardDir, manifest['shard'], nShards))
+    shards = sorted(manifest['shard'] for manifest in manifests)
+    if shards != list(range(nShards)):
+        raise ValueError('need each of the shards 0 to %d once, found %s' %(nShards - 1, shards))
+
+    store = ScoreStore(outDir, first['kinases'], first['modules'], first['iterations'], first['seed'], first['blockSize'])
+    for shardDir, manifest in zip(shardDirs, manifests):
+        scores = np.load(os.path.join(shardDir, manifest['array']), mmap_mode='r')
+        row    = 0
+        for kIdx, block, size in manifest['tasks']:
+            store.write(kIdx, block, scores[row:row + size])
+            row += size
+    store.manifest['shards'] = nShards
+    store.manifest['params'] = first['run']
+    store.close()
+    return store.manifest
+
+
+def loadScoreStore(outDir, mmap=True):
+    """ Open a score store written by ScoreStore.  Returns the manifest dict and the
+    (n_kinase, n_module, iterations) array, memory-mapped read only unless mmap is False.
+    Raises ValueError when the run that wrote the store did not finish. """
+    checkComplete(outDir)
+    with open(os.path.join(outDir, StoreManifest), 'r') as f:
+        manifest = json.load(f)
+    scores = np.load(os.path.join(outDir, manifest['array']), mmap_mode='r' if mmap else None)
+    return manifest, scores
+
+
+def storeNull(manifest, scores):
+    """ Map each module name to all of its shuffled scores (every kinase, every iteration)
+    from a score store opened with loadScoreStore. """
+    return { module : scores[:, idx, :].ravel() for idx, module in enumerate(manifest['modules']) }
+
+
+class Checkpoint(object):
+    """ Checkpoint of a shuffle run, the (kinase, iteration block) units that are safely on disk.
+
+    The checkpoint file (CheckpointFile, JSON) holds the run parameters, the finished units,
+    the byte length of every text output file at the time of the checkpoint and whether the
+    run is complete.  It is replaced atomically (temporary file + os.replace) and only after
+    the scores it lists have been flushed, so a run killed at any point leaves either the old
+    or the new checkpoint and never a unit recorded without its scores.
+
+    Attributes:
+        path     - checkpoint file
+        params   - dict of run parameters, a resumed run must match them
+        interval - minimum seconds between checkpoints
+        done     - set of finished (kinaseIdx, block) units
+        offsets  - dict, text output file -> bytes written at the checkpoint, None for a ScoreStore
+        complete - True once every unit is written and the output closed
+    """
+
+    def __init__(self, outDir, params, interval=60.0):
+        self.path     = os.path.join(outDir, CheckpointFile)
+        self.params   = params
+        self.interval = interval
+        self.done     = set()
+        self.offsets  = None
+        self.complete = False
+        self.lastSave = time.time()
+
+    def resume(self):
+        """ Load the units finished by an earlier run with the same parameters.  Returns False
+        when there is no checkpoint, raises ValueError when the parameters differ. """
+        state = loadCheckpoint(os.path.dirname(self.path))
+        if state is None:
+            return False
+        if state['params'] != self.params:
+            changed = sorted(key for key in set(state['params']) | set(self.params)
+                             if state['params'].get(key) != self.params.get(key))
+            raise ValueError('%s belongs to a run with different %s' %(self.path, ', '.join(changed)))
+        self.done     = set(tuple(unit) for unit in state['done'])
+        self.offsets  = state['offsets']
+        self.complete = state['complete']
+        return True
+
+    def mark(self, kIdx, block):
+        self.done.add((kIdx, block))
+
+    def due(self):
+        """ True when interval seconds have passed since the last checkpoint """
+        return time.time() - self.lastSave >= self.interval
+
+    def save(self, offsets=None):
+        """ Write the checkpoint, the output must be flushed (writer.sync()) first """
+        self.offsets = offsets
+        state = { 'params'   : self.params,
+                  'done'     : sorted(self.done),
+                  'offsets'  : offsets,
+                  'complete' : self.complete }
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as out:
+            json.dump(state, out)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, self.path)
+        self.lastSave = time.time()
+
+
+def loadCheckpoint(outDir):
+    """ Checkpoint dict (params, done, offsets, complete) of the run in outDir, None if there is none """
+    path = os.path.join(outDir, CheckpointFile)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def checkComplete(outDir):
+    """ Raise ValueError if outDir holds an unfinished, checkpointed shuffle run.  Outputs of
+    runs without a checkpoint file are accepted as they are. """
+    state = loadCheckpoint(outDir)
+    if state is None:
+        return
+    params = state['params']
+    total  = len(shardTasks(len(params['kinases']), params['iterations'], *params.get('shard', (0, 1))))
+    if not state['complete'] or len(state['done']) != total:
+        raise ValueError('%s holds an unfinished shuffle run, %d of %d blocks done; rerun kullback-Leibler.py '
+                         'with the same arguments to resume it' %(outDir, len(state['done']), total))
+
+
+def fdrTable(observed, null, correction=None, perModule=True):
+    """ FDR for every kinase-module score.
+
+    observed   - DataFrame with Scores, Kinase and Module columns, the unshuffled scores
+    null       - dict, module name -> array of shuffled scores for that module
+    correction - optional FDRCorrection method (bh, by or storey), adds an Adjusted_FDR
+                 column, the FDR values corrected for the number of kinases tested
+    perModule  - correct each module's kinases as one family of tests (True) or all
+                 kinase-module pairs together (False)
+
+    Each module's null distribution is sorted once and np.searchsorted counts the shuffled
+    scores below every observed score for that module in one call.  Modules without a null
+    distribution are dropped.  Returns a DataFrame with Scores, Kinase, Module,
+    Counts_Less_Than, Number_of_Scores and FDR columns, sorted by FDR within each module.
+    """
+    frames = []
+    for module, df in observed.groupby('Module', sort=False):
+        if module not in null:
+            continue
+        dist = np.sort(np.asarray(null[module], dtype=np.float64).ravel())
+        df   = df[['Scores', 'Kinase', 'Module']].copy()
+        df['Counts_Less_Than'] = np.searchsorted(dist, df['Scores'].values, side='left')
+        df['Number_of_Scores'] = len(dist)
+        df['FDR'] = df['Counts_Less_Than'] / float(len(dist))
+        frames.append(df.sort_values('FDR', kind='mergesort'))
+    if not frames:                                             # no module has a null distribution
+        return pd.DataFrame(columns=FdrColumns + ([ 'Adjusted_FDR' ] if correction is not None else []))
+    table = pd.concat(frames, ignore_index=True)
+    if correction is not None:
+        table['Adjusted_FDR'] = fc.adjust(table['FDR'].values, correction, table['Module'].values if perModule else None)
+    return table
+
+
+def runBlocks(engine, iterations, seed, procs=1, cache=None, monitor=None, done=None, shard=(0, 1)):
+    """ Shuffle and score every (kinase, block) task of a run, yields (kinaseIdx, block, scores)
+    in task order (see shuffleTasks), scores is a (size, n_module) array.  With procs > 1
+    the blocks are scored by a multiprocessing Pool.  Task timings are passed to monitor
+    (a RunMonitor) when given.  Units in done, a set of (kinaseIdx, block), are skipped.
+    shard, (shard, nShards), limits the run to the tasks of one shard, see shardTasks. """
+    tasks    = [ task for task in shardTasks(len(engine.kinases), iterations, *shard)
+                 if done is None or task[:2] not in done ]
+    initargs = (engine, seed, None, cache)
+    if procs > 1:
+        pool    = multiprocessing.Pool(procs, initWorker, initargs)
+        results = pool.imap(scoreBlock, tasks)
+    else:
+        initWorker(*initargs)
+        pool    = None
+        results = map(scoreBlock, tasks)
+    try:
+        for kIdx, block, scores, stats in results:
+            if monitor is not None:
+                monitor.task(scores.size, stats)
+            yield kIdx, block, scores
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+def score_matrix(kinases, modules, maxShift=0, pseudocount=0, metric='kl'):
+    """ Unshuffled KLD of every kinase PWM against every module PWM.  kinases and modules
+    are anything PWMRegistry.load accepts.  Returns a DataFrame, one row per kinase and
+    one column per module. """
+    engine = KLEngine(kinases, modules, maxShift, pseudocount, metric)
+    return pd.DataFrame(engine.score(), index=engine.kinases, columns=engine.modules)
+
+
+def null_distribution(kinases, modules, iterations, seed, procs=1, maxShift=0, cache=None, pseudocount=0, metric='kl'):
+    """ Shuffled KLD scores, the same scores kullback-Leibler.py -i iterations -s seed writes.
+    Returns a float64 array (n_kinase, n_module, iterations), laid out like the ScoreStore.
+    Large runs (63 x 500 x 10000 is 2.5 GB) are better written to a store with
+    kullback-Leibler.py -b and passed to fdr as a directory. """
+    engine = KLEngine(kinases, modules, maxShift, pseudocount, metric)
+    null   = np.empty((len(engine.kinases), len(engine.modules), iterations))
+    for kIdx, block, scores in runBlocks(engine, iterations, seed, procs, cache):
+        start = block * BlockSize
+        null[kIdx, :, start:start + scores.shape[0]] = scores.T
+    return null
+
+
+def fdr(kinases, modules, null, maxShift=0, pseudocount=0, metric='kl', correction=None, perModule=True):
+    """ FDR of every unshuffled kinase-module score, see fdrTable.  null is the array from
+    null_distribution, the directory of a binary score store (kullback-Leibler.py -b) or
+    a dict of module name -> shuffled scores.  correction and perModule add the
+    Adjusted_FDR column, see fdrTable. """
+    engine = KLEngine(kinases, modules, maxShift, pseudocount, metric)
+    if isinstance(null, str):
+        manifest, scores = loadScoreStore(null)
+        null = storeNull(manifest, scores)
+    elif not isinstance(null, dict):
+        null = storeNull({ 'modules' : engine.modules }, null)
+    return fdrTable(engine.scoreTable(), null, correction, perModule)
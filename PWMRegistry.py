@@ -0,0 +1,274 @@
+#!/home/mplace/anaconda3/bin/python
+"""
+Program: PWMRegistry.py
+
+Purpose: Load position weight matrices (PWMs) once, validate them and keep them as a
+         single typed array with a fixed amino acid order.
+
+         The Mok et al kinase PWMs (Mok_kinase_PWMs/*.csv) never change, so instead of
+         parsing 63 csv files on every run they can be written once to a binary bundle
+         (.npz) which loads in milliseconds:
+
+             PWMRegistry.py -d Mok_kinase_PWMs/ -o Mok_kinase_PWMs.npz
+
+         kullback-Leibler.py -m accepts either the directory or the bundle.
+
+Input  : PWM csv files, Motif,AA,0,1,2,...,12  one file may hold several motifs.
+         The motif width is taken from the data, the position columns are the integer
+         columns 0,1,...,w-1 and w may be any odd number (13, 15, 21 ...), the central
+         column being the phosphorylated residue.  Columns other than Motif, AA, the
+         positions and the IC_*_Final columns are dropped.
+
+Information: every position has an information weight between 0 (uninformative) and 1,
+         used by the IC weighted KL metric (KLEngine).  The Mok PWMs carry it as the
+         IC_<position>_Final columns, which are 100 at uninformative positions and fall
+         towards 0 at the specificity determining ones, weight = 1 - IC_Final / 100.
+         PWMs without these columns get 1 - H / log2(20), H the column entropy.
+         Only the central residue of the Mok PWMs carries real weight (~0.96, the other
+         positions stay below 0.01); KLEngine.icklWeights scales each PWM's weights to
+         average 1 before ickl uses them.
+
+Width:   PWMs of different widths are aligned by their central residue.  A set holding
+         several widths, or two sets scored against each other by KLEngine, is cut down
+         to the narrowest width keeping the positions around the centre (centerCrop).
+
+Validation: every PWM must have all 20 amino acids and every position, each position
+         (column) must sum to 1 and every frequency must be greater than zero, i.e. the
+         PWM was built with a pseudocount.  Kullback-Leibler takes the log of every value.
+
+Pseudocount: PWMs built without a pseudocount (zero frequencies) are rejected unless a
+         pseudocount e is given, every PWM holding a zero then has each column replaced
+         by (x + e) / (sum(x) + 20e).  PWMs without zeros are left unchanged.
+
+Output : PWMRegistry object, or a .npz bundle holding names, pwm and aminoList arrays.
+"""
+import argparse
+import glob
+import numpy as np
+import os
+import pandas as pd
+import sys
+
+# amino acid order used for every PWM array, matches the AA column of the PWM files
+AminoList = ['A:', 'C:', 'D:', 'E:', 'F:', 'G:', 'H:', 'I:', 'K:', 'L:',
+             'M:', 'N:', 'P:', 'Q:', 'R:', 'S:', 'T:', 'V:', 'W:', 'Y:']
+
+# allowed difference from 1 for the sum of a PWM column
+SumTolerance = 1e-3
+
+
+def positions(width):
+    """ PWM position column names for a motif width, '0' ... str(width - 1) """
+    return [str(i) for i in range(width)]
+
+
+def positionColumns(df):
+    """ The position columns of a PWM DataFrame, the integer columns 0,1,...,w-1 in order """
+    cols = sorted((int(c) for c in df.columns if str(c).isdigit()))
+    if not cols or cols != list(range(len(cols))):
+        raise ValueError('PWM position columns must be numbered 0 to width - 1')
+    return positions(len(cols))
+
+
+def centerCrop(pwm, width):
+    """ Cut PWMs (..., 20, w) down to the central width positions, w and width both odd,
+    so the central (phosphorylated) residue stays in the middle. """
+    start = (pwm.shape[-1] - width) // 2
+    return pwm[..., start:start + width]
+
+
+def smooth(pwm, pseudocount):
+    """ Add pseudocount to every frequency of the PWMs (n, 20, w) holding a zero and
+    renormalize their columns, other PWMs are returned unchanged. """
+    pwm    = np.array(pwm, dtype=np.float64)
+    zeros  = (pwm <= 0).any(axis=(1, 2))
+    padded = pwm[zeros] + pseudocount
+    pwm[zeros] = padded / padded.sum(axis=1, keepdims=True)
+    return pwm
+
+
+def entropyInformation(pwm):
+    """ Information weight (n, w) of every position of the PWMs (n, 20, w), 1 - H / log2(20) """
+    return 1.0 + (pwm * np.log2(np.where(pwm > 0, pwm, 1.0))).sum(axis=1) / np.log2(pwm.shape[1])
+
+
+def pwmArray(df):
+    """ Convert a PWM DataFrame, which may hold several motifs, to a list of motif names,
+    a numpy array with shape (n_motif, 20, w) and the (n_motif, w) information weights
+    read from the IC_*_Final columns, NaN for motifs without them.  Rows are reordered to
+    AminoList.  The width w is read from the position columns, motifs that leave outer
+    positions empty are narrower and every motif is centre cropped to the narrowest width. """
+    names = list(df['Motif'].unique())
+    cols  = positionColumns(df)
+    pwms  = []
+    infos = []
+    for name in names:
+        motif = df.loc[df['Motif'] == name].set_index('AA').reindex(AminoList)
+        pwm   = motif[cols]
+        pwm   = pwm.loc[:, pwm.notnull().any()]                # positions this motif has
+        if pwm.isnull().values.any() or pwm.columns.tolist() != cols[:pwm.shape[1]]:
+            raise ValueError('PWM %s is missing amino acids or positions' %(name))
+        if pwm.shape[1] % 2 == 0:
+            raise ValueError('PWM %s has an even width (%d), no central residue' %(name, pwm.shape[1]))
+        icCols = [ 'IC_%s_Final' %(c) for c in pwm.columns ]
+        if all(c in motif.columns for c in icCols) and motif[icCols].notnull().values.all():
+            infos.append(1.0 - motif[icCols].values[0].astype(np.float64) / 100.0)
+        else:
+            infos.append(np.full(pwm.shape[1], np.nan))
+        pwms.append(pwm.values.astype(np.float64))
+    width = min(p.shape[1] for p in pwms)
+    return names, np.stack([ centerCrop(p, width) for p in pwms ]), np.stack([ centerCrop(i, width) for i in infos ])
+
+
+class PWMRegistry(object):
+    """ A validated set of PWMs.
+
+    Attributes:
+        names     - list of motif names, same order as pwm
+        pwm       - numpy float64 array (n_motif, 20, w), rows in AminoList order
+        aminoList - amino acid row labels
+        width     - number of PWM positions w, always odd
+        information - numpy float64 array (n_motif, w), information weight of every position
+    """
+
+    def __init__(self, names, pwm, validate=True, pseudocount=0, information=None):
+        """ Construct PWMRegistry from motif names and an (n_motif, 20, w) array, PWMs with
+        zero frequencies are smoothed when a pseudocount is given.  Missing (None or NaN)
+        information weights are computed from the PWM entropy. """
+        self.names     = [ str(n) for n in names ]
+        self.pwm       = np.ascontiguousarray(pwm, dtype=np.float64)
+        if pseudocount:
+            self.pwm   = smooth(self.pwm, pseudocount)
+        self.aminoList = list(AminoList)
+        self.width     = self.pwm.shape[2]
+        if information is None:
+            information = np.full(self.pwm.shape[::2], np.nan)
+        information    = np.array(information, dtype=np.float64)
+        missing        = np.isnan(information).any(axis=1)
+        information[missing] = entropyInformation(self.pwm[missing])
+        self.information = information
+        if self.width % 2 == 0:
+            raise ValueError('PWM width must be odd, got %d' %(self.width))
+        if len(self.names) != len(set(self.names)):
+            raise ValueError('Duplicate motif names in PWM set')
+        if validate:
+            self.validate()
+
+    def __len__(self):
+        return len(self.names)
+
+    def validate(self):
+        """ Check column sums and that every frequency is > 0, raise ValueError naming the bad PWMs """
+        sums    = self.pwm.sum(axis=1)
+        badSum  = [ self.names[i] for i in np.flatnonzero((np.abs(sums - 1.0) > SumTolerance).any(axis=1)) ]
+        badZero = [ self.names[i] for i in np.flatnonzero((self.pwm <= 0).any(axis=(1, 2))) ]
+        errors  = []
+        if badSum:
+            errors.append('columns do not sum to 1: %s' %(', '.join(badSum)))
+        if badZero:
+            errors.append('zero frequencies, build PWMs with a pseudocount (or use --pseudocount): %s' %(', '.join(badZero)))
+        if errors:
+            raise ValueError('Invalid PWMs, ' + '; '.join(errors))
+
+    def index(self, name):
+        """ Position of a motif in names/pwm """
+        return self.names.index(name)
+
+    def crop(self, width):
+        """ New PWMRegistry holding the central width positions of every PWM """
+        if width == self.width:
+            return self
+        if width > self.width or width % 2 == 0:
+            raise ValueError('Cannot crop width %d PWMs to %d' %(self.width, width))
+        return PWMRegistry(self.names, centerCrop(self.pwm, width), validate=False, information=centerCrop(self.information, width))
+
+    def toDataFrame(self):
+        """ Return the PWMs in the csv layout, Motif,AA,0,1,...,w-1 """
+        df = pd.DataFrame(self.pwm.reshape(-1, self.width), columns=positions(self.width))
+        df.insert(0, 'AA', np.tile(self.aminoList, len(self.names)))
+        df.insert(0, 'Motif', np.repeat(self.names, len(self.aminoList)))
+        return df
+
+    def save(self, bundle):
+        """ Write the registry to a single binary .npz bundle """
+        np.savez(bundle, names=np.array(self.names), pwm=self.pwm, aminoList=np.array(self.aminoList),
+                 information=self.information)
+
+
+def fromDataFrame(df, validate=True, pseudocount=0):
+    """ PWMRegistry from a DataFrame in the csv layout """
+    names, arr, information = pwmArray(df)
+    return PWMRegistry(names, arr, validate, pseudocount, information)
+
+
+def loadCsv(filename, validate=True, pseudocount=0):
+    """ PWMRegistry from a single PWM csv file, i.e. position_weight_matrix.txt """
+    return fromDataFrame(pd.read_csv(filename, sep=','), validate, pseudocount)
+
+
+def loadDir(path, validate=True, pseudocount=0):
+    """ PWMRegistry from every .csv file in a directory (i.e. Mok_kinase_PWMs/), read in sorted order """
+    filenames = sorted(glob.glob(os.path.join(path, '*.csv')))
+    if not filenames:
+        raise ValueError('No PWM .csv files found in %s' %(path))
+    return fromDataFrame(pd.concat([ pd.read_csv(f, sep=',') for f in filenames ], ignore_index=True), validate, pseudocount)
+
+
+def loadBundle(bundle, validate=True, pseudocount=0):
+    """ PWMRegistry from a .npz bundle written by PWMRegistry.save """
+    with np.load(bundle) as dat:
+        if list(dat['aminoList']) != AminoList:
+            raise ValueError('PWM bundle %s uses a different amino acid order' %(bundle))
+        information = dat['information'] if 'information' in dat.files else None
+        return PWMRegistry(dat['names'], dat['pwm'], validate, pseudocount, information)
+
+
+def load(source, validate=True, pseudocount=0):
+    """ PWMRegistry from a directory of csv files, a .npz bundle, a csv file or a DataFrame.
+    An existing PWMRegistry is returned as is, or smoothed with pseudocount. """
+    if isinstance(source, PWMRegistry):
+        if pseudocount and (source.pwm <= 0).any():
+            return PWMRegistry(source.names, source.pwm, validate, pseudocount, source.information)
+        return source
+    if isinstance(source, pd.DataFrame):
+        return fromDataFrame(source, validate, pseudocount)
+    if os.path.isdir(source):
+        return loadDir(source, validate, pseudocount)
+    if source.endswith('.npz'):
+        return loadBundle(source, validate, pseudocount)
+    return loadCsv(source, validate, pseudocount)
+
+
+def main():
+    """
+    Build a binary PWM bundle from a directory of PWM csv files.
+    """
+    cmdparser = argparse.ArgumentParser(description="Validate PWM csv files and write a binary PWM bundle.",
+                                        usage='%(prog)s -d <PWM directory> -o <bundle.npz>', prog='PWMRegistry.py')
+    cmdparser.add_argument('-d', '--dir',  action='store', dest='DIR',  help='Directory of PWM .csv files, i.e. Mok_kinase_PWMs/', metavar='')
+    cmdparser.add_argument('-f', '--file', action='store', dest='FILE', help='Single PWM .csv file, instead of -d', metavar='')
+    cmdparser.add_argument('-o', '--out',  action='store', dest='OUT',  help='Output bundle, (Mok_kinase_PWMs.npz)', metavar='')
+    cmdResults = vars(cmdparser.parse_args())
+
+    # if no args print help
+    if len(sys.argv) == 1:
+        print('')
+        cmdparser.print_help()
+        sys.exit(1)
+
+    if cmdResults['DIR']:
+        registry = loadDir(cmdResults['DIR'])
+    elif cmdResults['FILE']:
+        registry = loadCsv(cmdResults['FILE'])
+    else:
+        print('\n\tERROR: -d or -f is required\n')
+        cmdparser.print_help()
+        sys.exit(1)
+
+    bundle = cmdResults['OUT'] if cmdResults['OUT'] else 'Mok_kinase_PWMs.npz'
+    registry.save(bundle)
+    print('Wrote %d PWMs to %s' %(len(registry), bundle))
+
+
+if __name__ == "__main__":
+    main()
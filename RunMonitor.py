@@ -0,0 +1,154 @@
+"""
+Program: RunMonitor.py
+
+Purpose: Progress, timing and throughput reporting for long kullback-Leibler.py runs, so
+         cluster logs show how far a job is, how fast it runs and how much memory it used.
+
+         Reports are JSON lines written to stdout (one JSON object per line):
+
+           {"event": "progress", "elapsed": 61.2, "done": 310, "total": 630, "scores": 3100000,
+            "scores_per_sec": 50653.6, "eta_sec": 63.2, "rss_mb": 198.0, "peak_rss_mb": 212.4,
+            "workers": {"4121": 155, "4122": 155}}
+
+         every interval seconds while work completes, and at the end
+
+           {"event": "summary", "elapsed": ..., "done": ..., "scores": ..., "scores_per_sec": ...,
+            "phases": {"load": ..., "shuffle": ..., "score": ..., "write": ...},
+            "workers": {"4121": {"tasks": ..., "scores": ..., "shuffle": ..., "score": ...}, ...},
+            "peak_rss_mb": ..., "peak_rss_children_mb": ...}
+
+         Phases timed in the main process (load, write, ...) are wall clock seconds, the
+         shuffle and score phases are the seconds summed over every worker.  Peak RSS is
+         the resident set size high water mark of this process and of its largest finished
+         child process (the Pool workers), as reported by the kernel.  rss_mb in progress
+         lines is the current resident set size of this process (/proc/self/statm, None
+         where /proc is not available).  eta_sec is estimated from the rate of the tasks
+         finished since the first one, so loading PWMs and starting the Pool do not count.
+
+Input  : timing and counts reported by kullback-Leibler.py and the KLEngine Pool tasks
+
+Output : JSON lines on stdout, summary dict (also written to run_summary.json)
+"""
+import contextlib
+import json
+import os
+import resource
+import sys
+import time
+
+# ru_maxrss is in kilobytes on linux, bytes on Mac OS X
+RssScale = 1024.0**2 if sys.platform == 'darwin' else 1024.0
+
+
+def peakRSS(who=resource.RUSAGE_SELF):
+    """ Peak resident set size in MB """
+    return resource.getrusage(who).ru_maxrss / RssScale
+
+
+def currentRSS():
+    """ Current resident set size of this process in MB, None where /proc is not available """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+    except (IOError, OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') / 1024.0**2
+
+
+class RunMonitor(object):
+    """ Collects per-worker progress and per-phase timings and emits them as JSON lines.
+
+    Attributes:
+        total    - number of tasks in the run, 0 when unknown
+        interval - seconds between progress lines
+        done     - tasks finished
+        first    - time the first task finished, None before
+        scores   - scores computed
+        phases   - dict, phase name -> seconds
+        workers  - dict, worker pid -> dict of tasks, scores, shuffle and score seconds
+    """
+
+    def __init__(self, total=0, interval=30.0, stream=sys.stdout):
+        self.total    = total
+        self.interval = interval
+        self.stream   = stream
+        self.start    = time.time()
+        self.lastEmit = self.start
+        self.done     = 0
+        self.first    = None
+        self.scores   = 0
+        self.phases   = {}
+        self.workers  = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """ Time a block of the main process, i.e.  with monitor.phase('load'): ... """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.addTime(name, time.time() - start)
+
+    def addTime(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def task(self, nScores, stats):
+        """ Record one finished Pool task, stats is the (pid, shuffle seconds, score seconds)
+        reported by the task.  Emits a progress line when interval seconds have passed. """
+        pid, shuffleTime, scoreTime = stats
+        worker = self.workers.setdefault(str(pid), { 'tasks' : 0, 'scores' : 0, 'shuffle' : 0.0, 'score' : 0.0 })
+        worker['tasks']   += 1
+        worker['scores']  += int(nScores)
+        worker['shuffle'] += shuffleTime
+        worker['score']   += scoreTime
+        self.addTime('shuffle', shuffleTime)
+        self.addTime('score', scoreTime)
+        self.done   += 1
+        self.scores += int(nScores)
+        now = time.time()
+        if self.first is None:
+            self.first = now
+        if now - self.lastEmit >= self.interval:
+            self.lastEmit = now
+            self.emit(self.progress())
+
+    def progress(self):
+        """ Progress record, throughput and estimated time to finish """
+        now     = time.time()
+        elapsed = now - self.start
+        rss     = currentRSS()
+        record  = { 'event'          : 'progress',
+                    'elapsed'        : round(elapsed, 3),
+                    'done'           : self.done,
+                    'total'          : self.total,
+                    'scores'         : self.scores,
+                    'scores_per_sec' : round(self.scores / elapsed, 1) if elapsed > 0 else None,
+                    'eta_sec'        : None,
+                    'rss_mb'         : round(rss, 1) if rss is not None else None,
+                    'peak_rss_mb'    : round(peakRSS(), 1),
+                    'workers'        : { pid : w['tasks'] for pid, w in self.workers.items() } }
+        if self.done > 1 and self.total and now > self.first:
+            rate = (self.done - 1) / (now - self.first)                 # tasks per second after the first one
+            record['eta_sec'] = round((self.total - self.done) / rate, 1)
+        return record
+
+    def summary(self):
+        """ Final record, emitted and returned """
+        elapsed = time.time() - self.start
+        record  = { 'event'                : 'summary',
+                    'elapsed'              : round(elapsed, 3),
+                    'done'                 : self.done,
+                    'total'                : self.total,
+                    'scores'               : self.scores,
+                    'scores_per_sec'       : round(self.scores / elapsed, 1) if elapsed > 0 else None,
+                    'phases'               : { name : round(sec, 3) for name, sec in self.phases.items() },
+                    'workers'              : { pid : { key : round(value, 3) for key, value in w.items() }
+                                               for pid, w in self.workers.items() },
+                    'peak_rss_mb'          : round(peakRSS(), 1),
+                    'peak_rss_children_mb' : round(peakRSS(resource.RUSAGE_CHILDREN), 1) }
+        self.emit(record)
+        return record
+
+    def emit(self, record):
+        self.stream.write(json.dumps(record) + '\n')
+        self.stream.flush()
@@ -0,0 +1,110 @@
+"""
+Program: SharedInteractors.py
+
+Purpose: Find the shared interactors of every submodule, the proteins of the background
+         network that interact with at least 2 of the submodule's constituent proteins.
+
+         The background network (BackgroundNetwork.py) holds a sparse protein x protein
+         adjacency matrix (CSR, one count per Protein1 -> Protein2 edge row), the submodules
+         are a sparse submodule x protein membership matrix, both built once.  The product
+
+             membership @ adjacency
+
+         holds m, the number of edges between the submodule proteins and each interactor, for
+         every (submodule, interactor) pair at once, instead of slicing the network once per
+         submodule.  With the undirected adjacency instead (the notebook, whose bgNtWk.csv
+         lists every interaction once) m is the number of submodule proteins interacting
+         with the interactor in either direction.
+
+         The enrichment p-value of a shared interactor is the hypergeometric upper tail
+         P(X >= m) = hypergeom.sf(m-1, N, M, n), computed for all shared interactors in one
+         call, once per distinct (N, M, n, m); the log of the tail (logsf) keeps p-values
+         below the double precision range.
+
+Input  : submodule constituents, Submodule,ORF (i.e. SubmoduleBuilder.submoduleMembers)
+         background network, a BackgroundNetwork or anything BackgroundNetwork.load accepts,
+         an edge list csv file or DataFrame, Protein1,Protein2,Interaction,Directed
+
+Output : shared interactor table, Submodule, Shared_Interactor, n (unique ORFs in the
+         submodule), m (edges between the submodule and the interactor)
+         target table, every background network edge between a submodule protein and one of
+         the submodule's shared interactors
+"""
+import BackgroundNetwork as bn
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.stats import hypergeom
+
+# fewest submodule proteins a shared interactor has to interact with
+MinTargets = 2
+
+
+def submoduleSizes(members):
+    """ Unique (Submodule, ORF) pairs and n, the number of unique ORFs in each submodule, in order
+    of first appearance """
+    members = members[['Submodule', 'ORF']].dropna().drop_duplicates()
+    sizes   = members.groupby('Submodule', sort=False).size()
+    return members, sizes
+
+
+def membershipMatrix(members, names, index):
+    """ submodule x protein CSR matrix, 1 where the protein is a submodule constituent.  ORFs
+    missing from the background network have no column and no interactors. """
+    inNetwork = members['ORF'].isin(index)
+    members   = members[inNetwork]
+    rows = members['Submodule'].map({ name : i for i, name in enumerate(names) }).to_numpy()
+    cols = members['ORF'].map(index).to_numpy()
+    return sp.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(len(names), len(index)))
+
+
+def network(source):
+    """ source as a BackgroundNetwork """
+    return source if isinstance(source, bn.BackgroundNetwork) else bn.load(source)
+
+
+def sharedInteractors(members, background, minTargets=MinTargets, undirected=False):
+    """ Submodule, Shared_Interactor, n and m for every interactor with at least minTargets edges
+    into its submodule, or with undirected at least minTargets submodule proteins it interacts
+    with either way.  Submodules in order of first appearance, interactors sorted by name. """
+    members, sizes = submoduleSizes(members)
+    background     = network(background)
+    proteins       = background.proteins
+    adjacency      = background.undirected if undirected else background.adjacency
+    counts = (membershipMatrix(members, sizes.index, background.index) @ adjacency).tocoo()
+    keep   = counts.data >= minTargets
+    shared = pd.DataFrame({ 'Submodule'         : sizes.index.to_numpy()[counts.row[keep]],
+                            'Shared_Interactor' : proteins[counts.col[keep]],
+                            'n'                 : sizes.to_numpy()[counts.row[keep]],
+                            'm'                 : counts.data[keep] })
+    order  = np.lexsort((counts.col[keep], counts.row[keep]))             # proteins are sorted, so column order is name order
+    return shared.iloc[order].reset_index(drop=True)
+
+
+def interactorTargets(members, background, shared):
+    """ The background network edges between each submodule's proteins and its shared interactors,
+    Submodule_Containing_Proteins, Possible_Shared_Interactors, the other edge columns, Submodule
+    and n.  Rows follow the order of shared, then edge list order. """
+    members = submoduleSizes(members)[0]
+    targets = network(background).edges().rename(columns={ 'Protein1' : 'Submodule_Containing_Proteins',
+                                                           'Protein2' : 'Possible_Shared_Interactors' })
+    targets = targets.assign(Edge=targets.index)
+    targets = targets.merge(members.rename(columns={ 'ORF' : 'Submodule_Containing_Proteins' }), on='Submodule_Containing_Proteins')
+    pairs   = shared[['Submodule', 'Shared_Interactor', 'n']].rename(columns={ 'Shared_Interactor' : 'Possible_Shared_Interactors' })
+    pairs   = pairs.assign(Pair=np.arange(len(pairs)))
+    targets = targets.merge(pairs, on=['Submodule', 'Possible_Shared_Interactors'])
+    return targets.sort_values(['Pair', 'Edge']).drop(columns=['Pair', 'Edge']).reset_index(drop=True)
+
+
+def hyperTail(N, M, n, m, log=False):
+    """ Hypergeometric upper tail P(X >= m), the chance of m or more of the n submodule proteins
+    being among the M interactors of a protein out of N, for arrays (or scalars) of N, M, n and m,
+    returned as a 1-d array, N and M are BackgroundNetwork.N and degree().  Repeated (N, M, n, m)
+    are computed once.  log returns the natural log of the tail, which stays finite where the
+    tail underflows to 0. """
+    keys = np.column_stack([ np.ravel(x) for x in np.broadcast_arrays(N, M, n, m) ]).astype(np.int64)
+    if len(keys) == 0:
+        return np.array([], dtype=float)
+    uniq, inverse = np.unique(keys, axis=0, return_inverse=True)
+    tail = hypergeom.logsf if log else hypergeom.sf
+    return tail(uniq[:, 3] - 1, uniq[:, 0], uniq[:, 1], uniq[:, 2])[inverse.ravel()]
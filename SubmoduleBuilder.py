@@ -0,0 +1,180 @@
+"""
+Program: SubmoduleBuilder.py
+
+Purpose: Build the modules and submodules of co-regulated phospho-peptides (Ppeps) from an
+         idModules table, for any number of mutant strains.
+
+         A module is a Cluster (Induced / Repressed) and Motif, Cluster_Motif.  A Ppep with a
+         phenotype in a mutant is placed in the submodule Cluster_Motif_mutant_phenotype, one
+         submodule for each mutant it has a phenotype in.  Ppeps without any phenotype are
+         placed in Cluster_Motif_No_Phenotype_Exists.
+
+Schema:  the mutant strain columns are described by a MutantSchema, taken from
+
+             the header   every column other than Ppep, Cluster, Motif and Peptide is a mutant
+                          (the default, what the notebook did with its ct = 4 column offset)
+             a list       i.e. ['hog1', 'pde2', 'cdc14']
+             a .json file {"mutants" : ["hog1", "pde2", "cdc14"],
+                           "no_phenotype" : ["No_Phenotype"]}
+
+         Empty cells and 0 mean no phenotype, no_phenotype lists more such values.
+
+         The Ppep x mutant phenotype matrix is unpacked in one numpy operation, so the work
+         grows with the number of phenotypes in the table and not with the number of mutant
+         columns; a 30 strain screen costs about what a 3 strain one does.
+
+Input  : idModules table, csv  Ppep,Cluster,Motif,Peptide,<mutant>,<mutant>,...
+         YGR240C_S895,Induced,......SP.....,NKKNEASPNTDAK,Induced_Amplified,Induced_Defective
+
+Output : submodule table, one row per Ppep and submodule, columns Ppep, Cluster, Motif,
+         Peptide, the mutants, freq (Ppeps in the module), Contribution and Phenotype (the
+         mutants with a phenotype and their phenotypes, ':' separated), subModule, Module.
+         writeSubmodules streams it to a tab separated file.
+"""
+import json
+import numpy as np
+import pandas as pd
+
+# columns of the idModules table that are not mutant strains
+IdColumns = ['Ppep', 'Cluster', 'Motif', 'Peptide']
+
+# phenotype of the submodule holding the Ppeps without a mutant phenotype
+NoPhenotype = 'No_Phenotype_Exists'
+
+# rows written per to_csv chunk by writeSubmodules
+ChunkSize = 50000
+
+
+class MutantSchema(object):
+    """ The mutant strain columns of an idModules table.
+
+    Attributes:
+        mutants     - mutant phenotype column names, in submodule order
+        noPhenotype - cell values that mean no phenotype, besides empty cells and 0
+    """
+
+    def __init__(self, mutants, noPhenotype=()):
+        self.mutants     = list(mutants)
+        self.noPhenotype = list(noPhenotype)
+        if not self.mutants:
+            raise ValueError('No mutant phenotype columns')
+        if len(self.mutants) != len(set(self.mutants)):
+            raise ValueError('Duplicate mutant columns in schema')
+
+    def validate(self, columns):
+        """ Raise ValueError when the table is missing an id or mutant column """
+        missing = [ col for col in IdColumns + self.mutants if col not in set(columns) ]
+        if missing:
+            raise ValueError('idModules table is missing the columns %s' %(', '.join(missing)))
+
+    def phenotypes(self, data):
+        """ (values, mask), the Ppep x mutant object array of phenotypes and a boolean array,
+        True where the mutant has a phenotype """
+        cells  = data[self.mutants]
+        values = cells.to_numpy(dtype=object)
+        mask   = cells.notna().to_numpy() & ~cells.isin([0] + self.noPhenotype).to_numpy()
+        return values, mask
+
+    def save(self, filename):
+        with open(filename, 'w') as out:
+            json.dump({ 'mutants' : self.mutants, 'no_phenotype' : self.noPhenotype }, out, indent=1)
+
+
+def fromHeader(columns):
+    """ MutantSchema with every column except the IdColumns, in header order """
+    return MutantSchema([ col for col in columns if col not in IdColumns ])
+
+
+def loadSchema(filename):
+    """ MutantSchema from a .json file, {"mutants" : [...], "no_phenotype" : [...]} """
+    with open(filename, 'r') as f:
+        config = json.load(f)
+    return MutantSchema(config['mutants'], config.get('no_phenotype', ()))
+
+
+def schemaFor(source, columns):
+    """ MutantSchema from a schema, a .json file, a list or comma separated string of mutant
+    columns, or (source None) the table header columns.  Checked against the columns. """
+    if isinstance(source, MutantSchema):
+        schema = source
+    elif source is None:
+        schema = fromHeader(columns)
+    elif isinstance(source, str) and source.endswith('.json'):
+        schema = loadSchema(source)
+    elif isinstance(source, str):
+        schema = MutantSchema(source.split(','))
+    else:
+        schema = MutantSchema(source)
+    schema.validate(columns)
+    return schema
+
+
+def joinRuns(strings, starts):
+    """ Join each run of strings with ':', starts holds the first position of every run.
+    np.add.reduceat concatenates the strings of all runs in one call. """
+    if len(strings) == 0:
+        return np.array([], dtype=object)
+    return np.array([ x[:-1] for x in np.add.reduceat(strings.astype(object) + ':', starts) ], dtype=object)
+
+
+def buildModules(data):
+    """ Ppeps with a Cluster and a Motif (Motif-X leaves it empty when none was found), with
+    the freq column, the number of Ppeps in the module """
+    data = data.dropna(subset=['Cluster', 'Motif'])
+    return data.assign(freq=data.groupby(['Cluster', 'Motif'])['Motif'].transform('count'))
+
+
+def submoduleParts(data, schema=None, minSize=2):
+    """ Submodule table in two parts, (phenotypes, noPhenotypes).  Phenotype submodules with
+    fewer than minSize Ppeps are dropped, Ppeps with phenotypes in several mutants are listed
+    once per mutant, in input order then mutant order.  schema is anything schemaFor accepts. """
+    schema  = schemaFor(schema, data.columns)
+    mutants = schema.mutants
+    data    = buildModules(data)
+    values, mask = schema.phenotypes(data)
+    module = data['Cluster'].map(str) + '_' + data['Motif']
+
+    # one row per Ppep - mutant phenotype
+    rowPos, colPos = np.nonzero(mask)
+    mutant    = np.array(mutants, dtype=object)[colPos]
+    phenotype = values[rowPos, colPos].astype(str)
+    starts    = np.flatnonzero(np.diff(rowPos, prepend=-1))                   # first phenotype of each Ppep
+    joined    = pd.DataFrame({ 'Contribution' : joinRuns(mutant, starts),
+                               'Phenotype'    : joinRuns(phenotype, starts) }, index=data.index[rowPos[starts]])
+
+    table = data[IdColumns].copy()
+    table[mutants] = data[mutants].where(mask, 0)
+    table['freq']  = data['freq']
+    table = table.join(joined)
+
+    rows        = data.index[rowPos]
+    phenotypes  = table.loc[rows]
+    phenotypes  = phenotypes.assign(subModule=module.loc[rows].values + '_' + mutant + '_' + phenotype)
+    if minSize > 1:
+        phenotypes = phenotypes[phenotypes.groupby('subModule')['subModule'].transform('size') >= minSize]
+
+    none         = ~mask.any(axis=1)
+    noPhenotypes = table.loc[none].assign(Phenotype=NoPhenotype)
+    noPhenotypes['subModule'] = module.loc[none] + '_' + NoPhenotype
+
+    return tuple(part.assign(Module=part['Cluster'].map(str) + '_' + part['Motif']) for part in (phenotypes, noPhenotypes))
+
+
+def buildSubmodules(data, schema=None, minSize=2):
+    """ The submodule table, phenotype submodules first, see submoduleParts """
+    return pd.concat(submoduleParts(data, schema, minSize))
+
+
+def writeSubmodules(data, filename, schema=None, minSize=2):
+    """ Write the submodule table of data (tab separated), the parts are streamed out in
+    chunks without building the combined table.  Returns the number of rows written. """
+    phenotypes, noPhenotypes = submoduleParts(data, schema, minSize)
+    phenotypes.to_csv(filename, sep='\t', chunksize=ChunkSize)
+    noPhenotypes.to_csv(filename, sep='\t', header=False, mode='a', chunksize=ChunkSize)
+    return len(phenotypes) + len(noPhenotypes)
+
+
+def submoduleMembers(table):
+    """ Unique (subModule, ORF) pairs of a submodule table, the ORF is the Ppep up to the first _ """
+    members = pd.DataFrame({ 'Submodule' : table['subModule'], 'ORF' : table['Ppep'].str.split('_').str[0] })
+    return members.drop_duplicates().reset_index(drop=True)
@@ -0,0 +1,252 @@
+#!/home/mplace/anaconda3/bin/python
+"""
+Program: benchmark_KL.py
+
+Purpose: Benchmark the Kullback-Leibler scoring and shuffle pipeline on synthetic PWMs so
+         changes to KLEngine.py / kullback-Leibler.py can be checked for speed and memory
+         regressions.  Runs offline, needs only numpy, pandas and scipy.
+
+         Synthetic kinase and module PWMs are drawn from a Dirichlet distribution (with a
+         pseudocount, like real PWMs), at these sizes (kinases x modules x shuffles):
+
+             realistic   63 x 20  x 1000
+             stress      63 x 100 x 10000,  63 x 500 x 10000
+
+         Each phase is timed separately, in a single process, and repeated (-r) times:
+
+             score     unshuffled kinase x module KL matrix
+             shuffle   drawing every shuffled kinase PWM (no scoring)
+             null      shuffle + score every block, what each Pool worker does
+             io_store  writing a full size binary ScoreStore, then reading it back
+             io_text   writing one block per kinase in the text (score, kinase) format
+             fdr       FDR of every kinase-module pair from the stored null (fdrTable)
+
+         For every phase the report holds the individual run times, the best and median
+         time and the peak memory allocated during the phase (tracemalloc, numpy arrays
+         included, measured in a separate untimed run so tracing does not skew the times).  The peak resident set size of the whole run is recorded as well.
+
+         The python/Kullback_Leibler_* and CalculateFDR scripts are command line wrappers
+         around KLEngine (score_matrix, null_distribution, fdrTable), their work is covered
+         by the score, null and fdr phases.
+
+Input  : suite name or explicit sizes
+
+Output : JSON report (benchmark_KL.json), diff it across commits or pass an older report
+         to --compare to print the change of every phase.
+
+Usage  : benchmark_KL.py -s realistic -o before.json
+         benchmark_KL.py -s realistic -o after.json --compare before.json
+"""
+import argparse
+import datetime
+import importlib
+import json
+import KLEngine as kle
+import numpy as np
+import os
+import platform
+import PWMRegistry as pwr
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# benchmark sizes, (kinases, modules, shuffles)
+Suites = { 'realistic' : [ (63, 20, 1000) ],
+           'stress'    : [ (63, 100, 10000), (63, 500, 10000) ] }
+
+# phase order in the report
+Phases = [ 'score', 'shuffle', 'null', 'io_store', 'io_text', 'fdr' ]
+
+
+def syntheticPWMs(n, width, rng, prefix, concentration=0.5, pseudocount=0.01):
+    """ n random PWMs (PWMRegistry), each column drawn from a Dirichlet distribution and mixed
+    with a pseudocount so every frequency is > 0.  A small concentration gives peaked,
+    motif like columns. """
+    pwm = rng.dirichlet(np.full(len(pwr.AminoList), concentration), size=(n, width)).transpose(0, 2, 1)
+    pwm = (pwm + pseudocount) / (1.0 + pseudocount * len(pwr.AminoList))
+    return pwr.PWMRegistry([ '%s%d' %(prefix, i) for i in range(n) ], pwm)
+
+
+def timePhase(func, repeat):
+    """ Run func repeat times, return the list of times (seconds) and the peak memory (MB)
+    allocated during a run.  The runs are timed with tracemalloc off, the peak memory is
+    measured in one more, untimed, run since allocation tracing slows numpy code down. """
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return times, peak / 1024.0**2
+
+
+def runCase(nKinase, nModule, iterations, width, repeat, seed, workDir, metric='kl'):
+    """ Time every phase for one benchmark size, returns the case dict for the report """
+    rng     = np.random.default_rng(seed)
+    engine  = kle.KLEngine(syntheticPWMs(nKinase, width, rng, 'kinase'), syntheticPWMs(nModule, width, rng, 'module'), metric=metric)
+    tasks   = kle.shuffleTasks(nKinase, iterations)
+    nullDir = os.path.join(workDir, 'null')                               # real shuffled scores, used by fdr
+    ioDir   = os.path.join(workDir, 'io')
+    os.makedirs(nullDir, exist_ok=True)
+    os.makedirs(ioDir, exist_ok=True)
+    kl      = importlib.import_module('kullback-Leibler')                 # TextWriter
+    kle.initWorker(engine, seed)
+
+    # fill the null store once, untimed, and keep the first block of every kinase as I/O data
+    store      = kle.ScoreStore(nullDir, engine.kinases, engine.modules, iterations, seed)
+    firstBlock = {}
+    for kIdx, block, scores, stats in map(kle.scoreBlock, tasks):
+        store.write(kIdx, block, scores)
+        if block == 0:
+            firstBlock[kIdx] = scores
+    store.close()
+
+    def shuffle():
+        for kIdx, block, size in tasks:
+            kle.blockShuffle(engine.kinasePWM[kIdx], seed, kIdx, block, size)
+
+    def null():
+        for task in tasks:
+            kle.scoreBlock(task)
+
+    def ioStore():
+        store = kle.ScoreStore(ioDir, engine.kinases, engine.modules, iterations, seed)
+        for kIdx, block, size in tasks:
+            store.write(kIdx, block, firstBlock[kIdx][:size])
+        store.close()
+        manifest, scores = kle.loadScoreStore(ioDir, mmap=False)
+
+    def ioText():
+        textDir = os.path.join(workDir, 'text') + '/'
+        os.makedirs(textDir, exist_ok=True)
+        writer = kl.TextWriter(textDir, engine.kinases, engine.modules)
+        for kIdx in range(nKinase):
+            writer.write(kIdx, 0, firstBlock[kIdx])
+        writer.close()
+        shutil.rmtree(textDir)
+
+    def fdr():
+        manifest, scores = kle.loadScoreStore(nullDir)
+        kle.fdrTable(engine.scoreTable(), kle.storeNull(manifest, scores))
+
+    case = { 'kinases' : nKinase, 'modules' : nModule, 'iterations' : iterations, 'width' : width, 'metric' : metric, 'phases' : {} }
+    for name, func in [ ('score', engine.score), ('shuffle', shuffle), ('null', null),
+                        ('io_store', ioStore), ('io_text', ioText), ('fdr', fdr) ]:
+        times, peak = timePhase(func, repeat)
+        case['phases'][name] = { 'seconds' : times,
+                                 'best'    : min(times),
+                                 'median'  : float(np.median(times)),
+                                 'peak_mb' : peak }
+        print('%3d x %3d x %5d  %-9s best %9.4f s  peak %9.1f MB' %(nKinase, nModule, iterations, name, min(times), peak))
+    shutil.rmtree(nullDir)
+    shutil.rmtree(ioDir)
+    return case
+
+
+def gitCommit():
+    """ Commit the benchmark ran on, or None outside a git checkout """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def caseKey(case):
+    return (case['kinases'], case['modules'], case['iterations'], case['width'], case.get('metric', 'kl'))
+
+
+def compare(report, old):
+    """ Print the best time of every phase against an older report """
+    oldCases = { caseKey(case) : case for case in old['cases'] }
+    print('\nCompared with %s' %(old['meta'].get('commit')))
+    for case in report['cases']:
+        if caseKey(case) not in oldCases:
+            continue
+        for name in Phases:
+            before = oldCases[caseKey(case)]['phases'].get(name)
+            if before is None:
+                continue
+            after = case['phases'][name]
+            print('%3d x %3d x %5d  %-9s %9.4f s -> %9.4f s  (x%.2f)' %(case['kinases'], case['modules'], case['iterations'],
+                  name, before['best'], after['best'], after['best'] / before['best']))
+
+
+def main():
+    """
+    Process command line arguments and run the benchmark.
+    """
+    cmdparser = argparse.ArgumentParser(description="Benchmark Kullback-Leibler scoring, shuffling, FDR and I/O on synthetic PWMs.",
+                                        usage='%(prog)s -s <suite> -o <report.json>', prog='benchmark_KL.py')
+    cmdparser.add_argument('-s', '--suite', action='store', dest='SUITE', metavar='',
+                           help='Benchmark sizes, realistic or stress, (realistic)')
+    cmdparser.add_argument('-z', '--sizes', action='store', dest='SIZES', metavar='',
+                           help='Explicit sizes instead of a suite, kinases x modules x shuffles, i.e. 63x20x1000,63x100x1000')
+    cmdparser.add_argument('-w', '--width', action='store', dest='WIDTH', metavar='',
+                           help='PWM width, (13)')
+    cmdparser.add_argument('-k', '--metric', action='store', dest='METRIC', metavar='',
+                           help='PWM comparison metric, see KLEngine.Metrics, (kl)')
+    cmdparser.add_argument('-r', '--repeat', action='store', dest='REPEAT', metavar='',
+                           help='Number of times each phase is run, (3)')
+    cmdparser.add_argument('-o', '--out', action='store', dest='OUT', metavar='',
+                           help='JSON report, (benchmark_KL.json)')
+    cmdparser.add_argument('--compare', action='store', dest='COMPARE', metavar='',
+                           help='Older JSON report to compare the timings with')
+    cmdResults = vars(cmdparser.parse_args())
+
+    if cmdResults['SIZES']:
+        try:
+            sizes = [ tuple(int(x) for x in size.split('x')) for size in cmdResults['SIZES'].split(',') ]
+        except ValueError:
+            sizes = [ () ]
+        if any(len(size) != 3 for size in sizes):
+            print('\n\tERROR: sizes are kinases x modules x shuffles, i.e. 63x20x1000\n')
+            sys.exit(1)
+    else:
+        suite = cmdResults['SUITE'] if cmdResults['SUITE'] else 'realistic'
+        if suite not in Suites:
+            print('\n\tERROR: unknown suite %s, use one of %s\n' %(suite, ', '.join(sorted(Suites))))
+            sys.exit(1)
+        sizes = Suites[suite]
+
+    width  = int(cmdResults['WIDTH']) if cmdResults['WIDTH'] else 13
+    repeat = int(cmdResults['REPEAT']) if cmdResults['REPEAT'] else 3
+    metric = cmdResults['METRIC'] if cmdResults['METRIC'] else 'kl'
+    outFile = cmdResults['OUT'] if cmdResults['OUT'] else 'benchmark_KL.json'
+    seed   = 2018                                                          # fixed, every run benchmarks the same PWMs
+
+    report = { 'meta' : { 'date'      : datetime.datetime.now().isoformat(),
+                          'commit'    : gitCommit(),
+                          'python'    : platform.python_version(),
+                          'numpy'     : np.__version__,
+                          'platform'  : platform.platform(),
+                          'cpus'      : os.cpu_count(),
+                          'repeat'    : repeat,
+                          'seed'      : seed },
+               'cases' : [] }
+    workDir = tempfile.mkdtemp(prefix='benchmark_KL_')
+    try:
+        for nKinase, nModule, iterations in sizes:
+            report['cases'].append(runCase(nKinase, nModule, iterations, width, repeat, seed, workDir, metric))
+    finally:
+        shutil.rmtree(workDir)
+    report['meta']['max_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0     # linux reports KB
+
+    with open(outFile, 'w') as out:
+        json.dump(report, out, indent=1)
+    print('Report written to %s' %(outFile))
+
+    if cmdResults['COMPARE']:
+        with open(cmdResults['COMPARE'], 'r') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
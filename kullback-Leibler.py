@@ -8,240 +8,271 @@ for FDR using the python Multiprocessing library.
 """
 import multiprocessing
 import argparse	                # handle command line args
+import cProfile                 # --profile
 import glob
-import math
-import numpy as np
+import json
+import KLEngine as kle          # vectorized Kullback-Leibler scoring
 import os
-import pandas as pd
-import random
+import PWMRegistry as pwr      # PWM loading and validation
+import RunMonitor as rm         # progress, timing and memory reporting
 import sys
+import time
+from scipy.stats import norm     # normal quantile for adaptive confidence intervals
 
-def SplitCompareTOMotifs_df(Input):
-    ''' Function splits the Compare_To DF by Motif, which is listed in the "Motif" column, and puts the new dataframes into a list'''
-    DF_CompareTo_lst =[]
-    for Motif in Input['Motif'].unique():
-        DF=Input.loc[Input['Motif']==Motif]
-        DF_CompareTo_lst.append(DF)
-    return DF_CompareTo_lst
+class TextWriter(object):
+    """ Write scores as one text file per module, each line is a (score, kinase) tuple """
 
-def Shuffle(df):
-    '''Shuffle each column by row, after first creating independent dataframes for each column (position within the PWM)''' 
+    def __init__(self, outDir, kinases, modules, offsets=None):
+        """ offsets, from a checkpoint, maps each module file to the bytes to keep when an
+        interrupted run is resumed, anything written after the checkpoint is cut off """
+        self.kinases  = kinases
+        self.modules  = modules
+        self.outFiles = {}
+        for module in modules:
+            path = outDir + module + '.csv'
+            if offsets is not None:
+                os.truncate(path, offsets[module])
+                self.outFiles[module] = open(path, 'a')
+            else:
+                self.outFiles[module] = open(path, 'w')
 
-    df_Index = df[['Motif','AA']]  
-    df_data_0 = df['0']#,'1','2','3','4','5','7','8','9','10','11','12']]
-    df_data_1 = df['1']#'2','3','4','5','7','8','9','10','11','12']]
-    df_data_2 = df['2']
-    df_data_3 = df['3']
-    df_data_4 = df['4']
-    df_data_5 = df['5']
-    df_data_6 = df['6']
-    df_data_7 = df['7']
-    df_data_8 = df['8']
-    df_data_9 = df['9']
-    df_data_10 = df['10']
-    df_data_11 = df['11']
-    df_data_12 = df['12']
-    Shuffled_Input_0=df_data_0.iloc[np.random.permutation(len(df_data_0))] 
-    Shuffled_Input_1=df_data_1.iloc[np.random.permutation(len(df_data_1))]                                  # Shuffle the data by row
-    Shuffled_Input_2=df_data_2.iloc[np.random.permutation(len(df_data_2))] 
-    Shuffled_Input_3=df_data_3.iloc[np.random.permutation(len(df_data_3))] 
-    Shuffled_Input_4=df_data_4.iloc[np.random.permutation(len(df_data_4))] 
-    Shuffled_Input_5=df_data_5.iloc[np.random.permutation(len(df_data_5))] 
-    Shuffled_Input_6=df_data_6.iloc[np.random.permutation(len(df_data_6))] 
-    Shuffled_Input_7=df_data_7.iloc[np.random.permutation(len(df_data_7))] 
-    Shuffled_Input_8=df_data_8.iloc[np.random.permutation(len(df_data_8))]
-    Shuffled_Input_9=df_data_9.iloc[np.random.permutation(len(df_data_9))] 
-    Shuffled_Input_10=df_data_10.iloc[np.random.permutation(len(df_data_10))] 
-    Shuffled_Input_11=df_data_11.iloc[np.random.permutation(len(df_data_11))] 
-    Shuffled_Input_12=df_data_12.iloc[np.random.permutation(len(df_data_12))] 
+    def write(self, kIdx, block, scores):
+        """ Write a block of scores, rows are iterations and columns modules """
+        for idx, module in enumerate(self.modules):
+            self.outFiles[module].write(''.join(str((float(x), self.kinases[kIdx])) + '\n' for x in scores[:, idx]))
 
-    Shuffled_Input_0_reset_Index= Shuffled_Input_0.reset_index(drop=True)                                   # reset the index for a later merge
-    Shuffled_Input_1_reset_Index= Shuffled_Input_1.reset_index(drop=True)
-    Shuffled_Input_2_reset_Index= Shuffled_Input_2.reset_index(drop=True) 
-    Shuffled_Input_3_reset_Index= Shuffled_Input_3.reset_index(drop=True)
-    Shuffled_Input_4_reset_Index= Shuffled_Input_4.reset_index(drop=True) 
-    Shuffled_Input_5_reset_Index= Shuffled_Input_5.reset_index(drop=True)
-    Shuffled_Input_6_reset_Index= Shuffled_Input_6.reset_index(drop=True) 
-    Shuffled_Input_7_reset_Index= Shuffled_Input_7.reset_index(drop=True)
-    Shuffled_Input_8_reset_Index= Shuffled_Input_8.reset_index(drop=True) 
-    Shuffled_Input_9_reset_Index= Shuffled_Input_9.reset_index(drop=True)
-    Shuffled_Input_10_reset_Index= Shuffled_Input_10.reset_index(drop=True)
-    Shuffled_Input_11_reset_Index= Shuffled_Input_11.reset_index(drop=True) 
-    Shuffled_Input_12_reset_Index= Shuffled_Input_12.reset_index(drop=True)
-    
-    result = pd.concat([df_Index, Shuffled_Input_0_reset_Index, Shuffled_Input_1_reset_Index, Shuffled_Input_2_reset_Index, Shuffled_Input_3_reset_Index,
-                       Shuffled_Input_4_reset_Index, Shuffled_Input_5_reset_Index, Shuffled_Input_6_reset_Index, Shuffled_Input_7_reset_Index,
-                       Shuffled_Input_8_reset_Index, Shuffled_Input_9_reset_Index, Shuffled_Input_10_reset_Index, Shuffled_Input_11_reset_Index, Shuffled_Input_12_reset_Index], axis=1) # concatenate the dataframes - they will sit side by side since have the same index (numbering)
-    result_reordered=result[[ 'Motif', 'AA','0','1', '2','3','4','5','6','7','8','9','10','11','12']]       # reorder the columns so in the correct PWM order.
-    
-    result_reordered_Index=result_reordered[['Motif','AA']]
-    result_reordered_Frame=result_reordered[['0','1', '2','3','4','5','6','7','8','9','10','11','12']]
-    cols = result_reordered_Frame.columns.tolist()                                                          # send column headers to a list
-   
-    random.shuffle(cols)                                                                                    # shuffle the columns, which are in a list by name, and return a different order
- 
-    
-    
-    FinalDF=result_reordered_Frame[cols]                                                                    # make a new dataframe with randomly shuffled columns
-    FinalDF.columns = ['0','1', '2','3','4','5','6','7','8','9','10','11','12']                             # reset the column names, so that they have the original names
-    FinalDataframe= pd.concat([result_reordered_Index, FinalDF],axis=1)
-    return FinalDataframe
+    def sync(self):
+        """ Flush every file to disk, returns the file lengths for the checkpoint """
+        offsets = {}
+        for module, out in self.outFiles.items():
+            out.flush()
+            os.fsync(out.fileno())
+            offsets[module] = out.tell()
+        return offsets
 
-def mergeInputMotifFile_withDF_CompareTo(df_Input,df_CompareTo):
-    ''' Merge the query and comparison PWMs so that KLD can be calculated by comparing column values'''
-    df_merged=df_Input.merge(df_CompareTo, on='AA')
-    #df_lst.append(df_merged)
-    return df_merged
-   
-def Calculate_log_x_y(df):
-        ''' Function takes the log2 value of the amino acid frequency at each position of the query/comparison motifs'''
-        df['0_log(x/y)'] = df.apply(lambda x: math.log(x['0_x'],2) - math.log(x['0_y'],2), axis=1)
-        df['1_log(x/y)'] = df.apply(lambda x: math.log(x['1_x'],2) - math.log(x['1_y'],2), axis=1)
-        df['2_log(x/y)'] = df.apply(lambda x: math.log(x['2_x'],2) - math.log(x['2_y'],2), axis=1)
-        df['3_log(x/y)'] = df.apply(lambda x: math.log(x['3_x'],2) - math.log(x['3_y'],2), axis=1)
-        df['4_log(x/y)'] = df.apply(lambda x: math.log(x['4_x'],2) - math.log(x['4_y'],2), axis=1)
-        df['5_log(x/y)'] = df.apply(lambda x: math.log(x['5_x'],2) - math.log(x['5_y'],2), axis=1)
-        df['6_log(x/y)'] = df.apply(lambda x: math.log(x['6_x'],2) - math.log(x['6_y'],2), axis=1)
-        df['7_log(x/y)'] = df.apply(lambda x: math.log(x['7_x'],2) - math.log(x['7_y'],2), axis=1)
-        df['8_log(x/y)'] = df.apply(lambda x: math.log(x['8_x'],2) - math.log(x['8_y'],2), axis=1)
-        df['9_log(x/y)'] = df.apply(lambda x: math.log(x['9_x'],2) - math.log(x['9_y'],2), axis=1)
-        df['10_log(x/y)'] = df.apply(lambda x: math.log(x['10_x'],2) - math.log(x['10_y'],2), axis=1)
-        df['11_log(x/y)'] = df.apply(lambda x: math.log(x['11_x'],2) - math.log(x['11_y'],2), axis=1)
-        df['12_log(x/y)'] = df.apply(lambda x: math.log(x['12_x'],2) - math.log(x['12_y'],2), axis=1)
-        return df
+    def close(self):
+        for out in self.outFiles.values():
+            out.close()
 
-def Calculate_log_y_x(df):
-        ''' Function takes the log2 value of the amino acid frequency at each position of the comparison/query motifs'''
-        df['0_log(y/x)'] = df.apply(lambda x: math.log(x['0_y'],2) - math.log(x['0_x'],2), axis=1)
-        df['1_log(y/x)'] = df.apply(lambda x: math.log(x['1_y'],2) - math.log(x['1_x'],2), axis=1)
-        df['2_log(y/x)'] = df.apply(lambda x: math.log(x['2_y'],2) - math.log(x['2_x'],2), axis=1)
-        df['3_log(y/x)'] = df.apply(lambda x: math.log(x['3_y'],2) - math.log(x['3_x'],2), axis=1)
-        df['4_log(y/x)'] = df.apply(lambda x: math.log(x['4_y'],2) - math.log(x['4_x'],2), axis=1)
-        df['5_log(y/x)'] = df.apply(lambda x: math.log(x['5_y'],2) - math.log(x['5_x'],2), axis=1)
-        df['6_log(y/x)'] = df.apply(lambda x: math.log(x['6_y'],2) - math.log(x['6_x'],2), axis=1)
-        df['7_log(y/x)'] = df.apply(lambda x: math.log(x['7_y'],2) - math.log(x['7_x'],2), axis=1)
-        df['8_log(y/x)'] = df.apply(lambda x: math.log(x['8_y'],2) - math.log(x['8_x'],2), axis=1)
-        df['9_log(y/x)'] = df.apply(lambda x: math.log(x['9_y'],2) - math.log(x['9_x'],2), axis=1)
-        df['10_log(y/x)'] = df.apply(lambda x: math.log(x['10_y'],2) - math.log(x['10_x'],2), axis=1)
-        df['11_log(y/x)'] = df.apply(lambda x: math.log(x['11_y'],2) - math.log(x['11_x'],2), axis=1)
-        df['12_log(y/x)'] = df.apply(lambda x: math.log(x['12_y'],2) - math.log(x['12_x'],2), axis=1)
-        return df
-
-def Calculate_Faax_times_log_x_y(df):
-    ''' Function multiplies the frequency of an amino acid (Faax) "Xa" at a specific position in the query motif against the log(Xa/Ya) for that amino acid
-     It is calculating this part of the function  "Xalog(Xa/Ya)" '''
-    df['F(aax)*0_log(x/y)']=df['0_x']*df['0_log(x/y)']
-    df['F(aax)*1_log(x/y)']=df['1_x']*df['1_log(x/y)']
-    df['F(aax)*2_log(x/y)']=df['2_x']*df['2_log(x/y)']
-    df['F(aax)*3_log(x/y)']=df['3_x']*df['3_log(x/y)']
-    df['F(aax)*4_log(x/y)']=df['4_x']*df['4_log(x/y)']
-    df['F(aax)*5_log(x/y)']=df['5_x']*df['5_log(x/y)']
-    df['F(aax)*6_log(x/y)']=df['6_x']*df['6_log(x/y)']
-    df['F(aax)*7_log(x/y)']=df['7_x']*df['7_log(x/y)']
-    df['F(aax)*8_log(x/y)']=df['8_x']*df['8_log(x/y)']
-    df['F(aax)*9_log(x/y)']=df['9_x']*df['9_log(x/y)']
-    df['F(aax)*10_log(x/y)']=df['10_x']*df['10_log(x/y)']
-    df['F(aax)*11_log(x/y)']=df['11_x']*df['11_log(x/y)']
-    df['F(aax)*12_log(x/y)']=df['12_x']*df['12_log(x/y)']
-    return df
+def runShuffle(iterations, engine, outDir, seed, procs, binary=False, cache=None, monitor=None, checkpoint=None, shard=(0, 1) ):
+    """
+    Score each Mok kinase PWM against every module PWM.  When more than one iteration
+    is requested the kinase PWM is shuffled (rows within columns, then columns) that
+    many times and every shuffled copy is scored against every module.
 
-def Calculate_Faay_times_log_y_x(df):
-    ''' Function multiplies the frequency of an amino acid (Faay) "Ya" at a specific position in the query motif against the log(Ya/Xa) for that amino acid
-     It is calculating this part of the function  "Yalog(Ya/Xa)" '''
-    df['F(aay)*0_log(y/x)']=df['0_y']*df['0_log(y/x)']
-    df['F(aay)*1_log(y/x)']=df['1_y']*df['1_log(y/x)']
-    df['F(aay)*2_log(y/x)']=df['2_y']*df['2_log(y/x)']
-    df['F(aay)*3_log(y/x)']=df['3_y']*df['3_log(y/x)']
-    df['F(aay)*4_log(y/x)']=df['4_y']*df['4_log(y/x)']
-    df['F(aay)*5_log(y/x)']=df['5_y']*df['5_log(y/x)']
-    df['F(aay)*6_log(y/x)']=df['6_y']*df['6_log(y/x)']
-    df['F(aay)*7_log(y/x)']=df['7_y']*df['7_log(y/x)']
-    df['F(aay)*8_log(y/x)']=df['8_y']*df['8_log(y/x)']
-    df['F(aay)*9_log(y/x)']=df['9_y']*df['9_log(y/x)']
-    df['F(aay)*10_log(y/x)']=df['10_y']*df['10_log(y/x)']
-    df['F(aay)*11_log(y/x)']=df['11_y']*df['11_log(y/x)']
-    df['F(aay)*12_log(y/x)']=df['12_y']*df['12_log(y/x)']
-    return df
+    The shuffle work is cut into (kinase, iteration block) tasks which a Pool of procs
+    workers processes (KLEngine.runBlocks).  Results stream back, in task order, to this process which is
+    the only writer.  Scores are written to one text file per module, each line is a
+    (score, kinase) tuple, or with binary to a KLEngine.ScoreStore.  Shuffled kinase
+    PWMs are reused from cache (a KLEngine.ShuffleCache) when given, and the cache is
+    pruned here, as blocks are written.  Progress and timings go to monitor (a RunMonitor).
 
-def Column_SUM(df):
-    ''' Function sums the values calculated by the previous two functions for each position, or column, in the PWMs  '''
-    df['sum_0']=sum(df['F(aax)*0_log(x/y)'])+sum(df['F(aay)*0_log(y/x)'])
-    df['sum_1']=sum(df['F(aax)*1_log(x/y)'])+sum(df['F(aay)*1_log(y/x)'])
-    df['sum_2']=sum(df['F(aax)*2_log(x/y)'])+sum(df['F(aay)*2_log(y/x)'])
-    df['sum_3']=sum(df['F(aax)*3_log(x/y)'])+sum(df['F(aay)*3_log(y/x)'])
-    df['sum_4']=sum(df['F(aax)*4_log(x/y)'])+sum(df['F(aay)*4_log(y/x)'])
-    df['sum_5']=sum(df['F(aax)*5_log(x/y)'])+sum(df['F(aay)*5_log(y/x)'])
-    df['sum_6']=sum(df['F(aax)*6_log(x/y)'])+sum(df['F(aay)*6_log(y/x)'])
-    df['sum_7']=sum(df['F(aax)*7_log(x/y)'])+sum(df['F(aay)*7_log(y/x)'])
-    df['sum_8']=sum(df['F(aax)*8_log(x/y)'])+sum(df['F(aay)*8_log(y/x)'])
-    df['sum_9']=sum(df['F(aax)*9_log(x/y)'])+sum(df['F(aay)*9_log(y/x)'])
-    df['sum_10']=sum(df['F(aax)*10_log(x/y)'])+sum(df['F(aay)*10_log(y/x)'])
-    df['sum_11']=sum(df['F(aax)*11_log(x/y)'])+sum(df['F(aay)*11_log(y/x)'])
-    df['sum_12']=(sum(df['F(aax)*12_log(x/y)'])+sum(df['F(aay)*12_log(y/x)']))
-    return df
+    With a checkpoint (a KLEngine.Checkpoint) the finished blocks are recorded every
+    checkpoint.interval seconds, blocks the checkpoint already holds (a resumed run) are
+    skipped and the output is reopened where the checkpoint left it.
 
-def TotalScore(df):
-    ''' Function calculates the total score by summing the summed values for each position in the PWM (13 positions)'''
-    df['FinalScore']=df['sum_0']+df['sum_1']+df['sum_2']+df['sum_3']+df['sum_4']+df['sum_5']+df['sum_6']+df['sum_7']+df['sum_8']+df['sum_9']+df['sum_10']+df['sum_11']+df['sum_12']
-    Lst=df['FinalScore'].unique()
-    n=Lst[0]
-    return n
+    shard, (shard, nShards), runs only that slice of the tasks (KLEngine.shardTasks) and
+    writes its scores to a KLEngine.ShardStore, merged with the other shards later.
+    """
+    if monitor is None:
+        monitor = rm.RunMonitor()
+    done = checkpoint.done if checkpoint is not None else set()
+    if shard[1] > 1:
+        params = checkpoint.params if checkpoint is not None else None
+        writer = kle.ShardStore(outDir, engine.kinases, engine.modules, iterations, seed, shard[0], shard[1], params, resume=bool(done))
+    elif binary:
+        writer = kle.ScoreStore(outDir, engine.kinases, engine.modules, max(iterations, 1), seed, resume=bool(done))
+    else:
+        writer = TextWriter(outDir, engine.kinases, engine.modules, checkpoint.offsets if done else None)
+    if iterations > 1:
+        monitor.total = len(kle.shardTasks(len(engine.kinases), iterations, *shard)) - len(done)
+        for kIdx, block, scores in kle.runBlocks(engine, iterations, seed, procs, cache, monitor, done, shard):
+            start = time.time()
+            writer.write(kIdx, block, scores)
+            if cache is not None:
+                cache.written()                                                    # prune as the run goes
+            if checkpoint is not None:
+                checkpoint.mark(kIdx, block)
+                if checkpoint.due():
+                    checkpoint.save(writer.sync())
+            monitor.addTime('write', time.time() - start)
+    else:
+        with monitor.phase('score'):
+            scores = engine.score()                                                # no shuffle, (n_kinase, n_module)
+        with monitor.phase('write'):
+            for kIdx in range(len(engine.kinases)):
+                writer.write(kIdx, 0, scores[kIdx:kIdx+1])
+    with monitor.phase('write'):
+        writer.close()
+    if checkpoint is not None:
+        checkpoint.complete = True
+        checkpoint.save()
 
-def runShuffle(iterations, DF_CompareTo_lst, dfs_lst, n, outDir ):
+def runAdaptive(maxIter, engine, outDir, seed, procs, threshold, confidence, cache=None, monitor=None ):
     """
+    Adaptive Monte-Carlo shuffle.  Each kinase is shuffled in blocks until the p-value
+    of every kinase-module pair (fraction of shuffled scores below the unshuffled score)
+    is confidently above or below threshold, or maxIter shuffles have been used.  One
+    Pool task per kinase, results are written to adaptive_pvalues.txt (tab separated):
+
+        Kinase  Module  Scores  Counts_Less_Than  Draws  PValue  Decision
+
+    Decision is 'below' or 'above' threshold, or 'undecided' when the budget ran out.
+
+    The interval is checked once per block, a fixed schedule of ceil(maxIter / BlockSize)
+    looks, and the error 1 - confidence is spent evenly over them (Bonferroni): every look
+    uses a 1 - (1 - confidence) / looks interval, so a pair is wrongly decided with
+    probability at most 1 - confidence over the whole run.
+
+    The output is a per pair p-value against that kinase's own shuffles, with a different
+    number of draws for every pair.  It is not a pooled per module null and is not
+    interchangeable with the full shuffle scores KLEngine.fdrTable reads; use it to screen
+    pairs, and a full (-i, no -a) run for the FDR table.
     """
-    ITER_NUM=iterations                                                            # interations of this function   
-    dict_Final={}
-    for df2 in dfs_lst:                                                            # this is the dataframe that has Mok Kinase PWMs
-        subModule_name=df2['Motif'].unique()
-        for df in DF_CompareTo_lst:                                                # select one of the compare to dataframes (Modules)
-            Kinase_name=[]
-            Kinase_name=df['Motif'].unique()
-       
-            for iteration in range (ITER_NUM):                                     # for iteration x 
-                if iterations > 1:
-                    Shuffled = Shuffle(df2)                                        # shuffle the dataframe by row and column
-                else:
-                    Shuffled = df2.copy()                                          # copy dataframe if running w/ no shuffle
-                df_merged=mergeInputMotifFile_withDF_CompareTo(Shuffled, df)   
-                DF_1=Calculate_log_x_y(df_merged)
-                DF_2=Calculate_log_y_x(DF_1)
-                DF_3=Calculate_Faax_times_log_x_y(DF_2)
-                DF_4=Calculate_Faay_times_log_y_x(DF_3)
-                DF_5=Column_SUM(DF_4)
-            
-                n=TotalScore(DF_5)
-                test_tup = (n, subModule_name[0])
-                if Kinase_name[0] in dict_Final:
-                    dict_Final[Kinase_name[0]].append(test_tup)
+    if monitor is None:
+        monitor = rm.RunMonitor()
+    observed = engine.score()
+    looks    = len(kle.iterationBlocks(maxIter))                                 # the interval is checked after every block
+    alpha    = (1.0 - confidence) / looks                                         # error spent at each look
+    z        = norm.ppf(1.0 - alpha / 2.0)                                       # two sided normal quantile
+    tasks    = [ (kIdx, threshold, maxIter, z) for kIdx in range(len(engine.kinases)) ]
+    total    = 0
+    monitor.total = len(tasks)
+    with multiprocessing.Pool(procs, kle.initWorker, (engine, seed, observed, cache)) as pool, \
+         open(outDir + 'adaptive_pvalues.txt', 'w') as out:
+        out.write('Kinase\tModule\tScores\tCounts_Less_Than\tDraws\tPValue\tDecision\n')
+        for done, (kIdx, counts, draws, undecided, stats) in enumerate(pool.imap(kle.adaptiveKinase, tasks), 1):
+            monitor.task(draws.sum(), stats)
+            for idx, module in enumerate(engine.modules):
+                pvalue = float(counts[idx] / draws[idx])
+                if undecided[idx]:
+                    decision = 'undecided'
+                elif pvalue < threshold:
+                    decision = 'below'
                 else:
-                    lst=[]
-                    dict_Final[Kinase_name[0]] = lst
-                    dict_Final[Kinase_name[0]].append(test_tup)
-                     
-    for k, v in dict_Final.items():  
-        newFile = outDir + k + '.csv'     
-        with open(newFile, 'a') as output:                                        # need to append when using multiple processes
-            for x in v:
-                #for subModule_name in filenames:
-                output.write(str(x))
-                output.write("\n")
+                    decision = 'above'
+                out.write('%s\t%s\t%r\t%d\t%d\t%r\t%s\n' %(engine.kinases[kIdx], module, float(observed[kIdx, idx]),
+                                                             counts[idx], draws[idx], pvalue, decision))
+            total += draws.sum()
+            if cache is not None:
+                cache.written(len(kle.iterationBlocks(draws.max())))               # blocks this kinase drew
+            print('Kinase %d of %d done, %d shuffles used' %(done, len(tasks), draws.max()))
+        pool.close()
+        pool.join()
+    print('Adaptive shuffle used %d of %d kinase-module scores' %(total, maxIter * observed.size))
+
+def runApprox(samples, engine, outDir, seed, threshold, compareDir=None, cache=None, monitor=None ):
+    """
+    Screening pass, approximate FDRs from a gamma null fitted to a small number of shuffles
+    per kinase (see KLEngine.approxFDR).  Written to approx_fdr.txt (tab separated).  When
+    compareDir holds a binary store from a full shuffle run (-b) the exact FDR and the
+    absolute error of the approximation are added as FDR_Full and Abs_Error.
+    """
+    if monitor is None:
+        monitor = rm.RunMonitor()
+    with monitor.phase('approx'):
+        table  = engine.approxFDR(samples, seed, threshold, cache)
+    if compareDir:
+        manifest, scores = kle.loadScoreStore(compareDir)
+        full = kle.fdrTable(engine.scoreTable(), kle.storeNull(manifest, scores))
+        table = table.merge(full[['Kinase', 'Module', 'FDR']].rename(columns={'FDR' : 'FDR_Full'}), on=['Kinase', 'Module'], how='left')
+        table['Abs_Error'] = (table['FDR_Approx'] - table['FDR_Full']).abs()
+        print('Approximate FDR, mean absolute error %g, max %g' %(table['Abs_Error'].mean(), table['Abs_Error'].max()))
+    table.to_csv(outDir + 'approx_fdr.txt', sep='\t', index=False)
+    print('%d of %d kinase-module pairs are borderline' %(table['Borderline'].sum(), len(table)))
+
+def writeSeed(outDir, seed, iterations, maxShift=0, metric='kl'):
+    """ Record the seed and run settings with the output, seed.txt """
+    with open(outDir + 'seed.txt', 'w') as out:
+        out.write('seed\t%d\niterations\t%d\n' %(seed, iterations))
+        if maxShift:
+            out.write('shift\t%d\n' %(maxShift))
+        if metric != 'kl':
+            out.write('metric\t%s\n' %(metric))
+
+def runMerge(argv):
+    """
+    merge subcommand, check the shard stores of a --shard run and combine them into one
+    binary score store (null_scores.npy + null_scores.json), as a -b run would write:
+
+        kullback-Leibler.py merge -o <output directory> [shard directories]
+
+    Without shard directories every shard_*_of_* directory in the output directory is used.
+    """
+    cmdparser = argparse.ArgumentParser(description="Merge the shards of a kullback-Leibler.py --shard run into one binary score store.",
+                                        usage='%(prog)s -o <output directory> [shard directories]', prog='kullback-Leibler.py merge')
+    cmdparser.add_argument('-o', '--out', action='store', dest='OUT', metavar='',
+                           help='Output directory of the shard runs, the merged store is written here')
+    cmdparser.add_argument('SHARDS', nargs='*', metavar='shard',
+                           help='Shard directories, (every shard_*_of_* directory of the output directory)')
+    cmdResults = vars(cmdparser.parse_args(argv))
+
+    if not cmdResults['OUT']:
+        print('')
+        cmdparser.print_help()
+        sys.exit(1)
+    outDir    = os.path.join(cmdResults['OUT'], '')
+    shardDirs = cmdResults['SHARDS'] if cmdResults['SHARDS'] else sorted(glob.glob(outDir + 'shard_*_of_*'))
+    try:
+        manifest = kle.mergeShards(shardDirs, outDir)
+    except ValueError as err:
+        print('\n\tERROR: %s\n' %(err))
+        sys.exit(1)
+    params = manifest['params']
+    writeSeed(outDir, manifest['seed'], manifest['iterations'], params.get('shift', 0), params.get('metric', 'kl'))
+    print('Merged %d shards into %s, %d kinases x %d modules x %d iterations'
+          %(manifest['shards'], outDir + kle.StoreArray, len(manifest['kinases']), len(manifest['modules']), manifest['iterations']))
 
 def main():
     """
     Process command line arguments and run program.
     """    
+    if len(sys.argv) > 1 and sys.argv[1] == 'merge':
+        runMerge(sys.argv[2:])
+        return
     cmdparser = argparse.ArgumentParser(description="Shuffle kullback-Leibler results for use w/ FDR function.",
                                         usage='%(prog)s -f <Position weight matrix file>  ', prog='Shuffle_kullback-Leibler.py'  )                                  
     cmdparser.add_argument('-f', '--file', action='store', dest='FILE', 
                            help='position_weight_matrix.txt file, ', metavar='')
-    cmdparser.add_argument('-m', '--mokdir', action='store', dest='MOK', help='Full path to Mok_kinase_PWMs directory',
+    cmdparser.add_argument('-m', '--mokdir', action='store', dest='MOK', help='Full path to Mok_kinase_PWMs directory, or a PWM bundle from PWMRegistry.py',
                            metavar='')
     cmdparser.add_argument('-i', '--iterations', action='store', dest='ITER', metavar='', 
-                           help='Total number of iterations, this will be divided by number of processes.')
+                           help='Total number of iterations, shared between the processes.')
     cmdparser.add_argument('-o', '--out', action='store', dest='OUT', help='Output directory', metavar='')
     cmdparser.add_argument('-p', '--processes', action='store', dest='PROC', metavar='',
                            help='Number of processes to run, be smart don\'t use more than you have!')
+    cmdparser.add_argument('-b', '--binary', action='store_true', dest='BINARY',
+                           help='Write scores to a binary store (null_scores.npy + null_scores.json) instead of text files.')
+    cmdparser.add_argument('-s', '--seed', action='store', dest='SEED', metavar='',
+                           help='Random seed, the same seed and iterations reproduce the same shuffles.')
+    cmdparser.add_argument('-a', '--adaptive', action='store', dest='ADAPT', metavar='',
+                           help='Adaptive mode, p-value threshold; shuffle each pair only until its p-value is confidently above or below it, -i is the maximum. Per pair p-values, not an FDR table input.')
+    cmdparser.add_argument('-c', '--confidence', action='store', dest='CONF', metavar='',
+                           help='Confidence level of the adaptive mode decisions over all looks, split evenly over the blocks, (0.99)')
+    cmdparser.add_argument('-g', '--gamma', action='store', dest='GAMMA', metavar='',
+                           help='Screening mode, fit a gamma null to this many shuffles per kinase and write approximate FDRs.')
+    cmdparser.add_argument('-t', '--threshold', action='store', dest='THRESH', metavar='',
+                           help='FDR threshold used to flag borderline pairs in screening mode, (0.05)')
+    cmdparser.add_argument('--compare', action='store', dest='COMPARE', metavar='',
+                           help='Screening mode, directory of a full binary (-b) shuffle run to measure the approximation error against.')
+    cmdparser.add_argument('--shard', action='store', dest='SHARD', metavar='',
+                           help='Cluster fan out, i/N runs shard i (0 to N-1) of the shuffle into <out>/shard_i_of_N, needs -s; combine the shards with: kullback-Leibler.py merge -o <out>')
+    cmdparser.add_argument('--checkpoint', action='store', dest='CHECKPOINT', metavar='',
+                           help='Seconds between checkpoints of a shuffle run, a killed run started again with the same arguments resumes from its last checkpoint, (60)')
+    cmdparser.add_argument('--cache', action='store', dest='CACHE', metavar='',
+                           help='Directory to cache shuffled kinase PWMs in, reused by later runs with the same seed and kinase PWMs.')
+    cmdparser.add_argument('--cache-size', action='store', dest='CACHESIZE', metavar='',
+                           help='Cache size limit in MB, least recently used blocks are removed, (1024)')
+    cmdparser.add_argument('--metric', action='store', dest='METRIC', metavar='',
+                           help='PWM comparison metric, kl (Kullback-Leibler), ickl (information weighted KL, on the Mok PWMs dominated by the central residue), js (Jensen-Shannon), pearson (1 - column correlation) or ssd (sum of squared differences), (kl)')
+    cmdparser.add_argument('--progress', action='store', dest='PROGRESS', metavar='',
+                           help='Seconds between JSON progress lines, (30)')
+    cmdparser.add_argument('--profile', action='store', dest='PROFILE', metavar='',
+                           help='Write a cProfile of the main process to this file, use -p 1 to include the scoring')
+    cmdparser.add_argument('--pseudocount', action='store', dest='PSEUDO', metavar='',
+                           help='Smooth PWMs that hold zero frequencies with this pseudocount instead of stopping with an error, i.e. 0.001')
+    cmdparser.add_argument('--shift', action='store', dest='SHIFT', metavar='',
+                           help='Offset search, score every relative shift of the kinase and module PWMs up to this many positions and keep the best; every score costs 2*shift+1 comparisons, no early exit, (0)')
     cmdResults = vars(cmdparser.parse_args())
     
     # if no args print help
@@ -250,9 +281,23 @@ def main():
         cmdparser.print_help()
         sys.exit(1)
                 
-    # Get the inputfile
+    # progress lines every PROGRESS seconds, phase timings and peak memory for the summary
+    monitor = rm.RunMonitor(interval=float(cmdResults['PROGRESS']) if cmdResults['PROGRESS'] else 30.0)
+    
+    # Get the pseudocount for PWMs with zero frequencies, by default they are an error
+    if cmdResults['PSEUDO']:
+        pseudocount = float(cmdResults['PSEUDO'])
+    else:
+        pseudocount = 0
+        
+    # Get the inputfile, the module PWMs
     if cmdResults['FILE']:
-        Input = pd.read_csv( cmdResults['FILE'])
+        try:
+            with monitor.phase('load'):
+                modules = pwr.load(cmdResults['FILE'], pseudocount=pseudocount)
+        except ValueError as err:                                                  # i.e. zero frequencies without --pseudocount
+            print('\n\tERROR: module PWMs %s, %s\n' %(cmdResults['FILE'], err))
+            sys.exit(1)
     else:
         print('')
         cmdparser.print_help()
@@ -265,23 +310,49 @@ def main():
         procs = 1     # number of processes, defaults to 1           
         
     if cmdResults['ITER']:
-        iterations = int(int(cmdResults['ITER'])/procs)
+        iterations = int(cmdResults['ITER'])
     else:
         iterations = 1     # Default to run the KL test once
         
-    DF_CompareTo_lst=SplitCompareTOMotifs_df(Input)
-    
-    # Import the Mok Kinases PWM .csv files individually and create dataframes
-    if cmdResults['MOK']:
-        mokPath = cmdResults['MOK']
-        if os.path.exists(mokPath):
-            filenames = glob.glob( mokPath + '*.csv') 
-        else:
-            print('\n\tERROR:  Mok_kinase_PWMs path not found ')
-            print('\tCheck path and try again\n' )
-            cmdparser.print_help()
+    if iterations <= 1:
+        procs = 1          # nothing to share when the data is not shuffled
+        
+    # Get the random seed, if missing draw a new one so the run can still be repeated
+    if cmdResults['SEED']:
+        seed = int(cmdResults['SEED'])
+    else:
+        seed = kle.newSeed()
+        
+    # Load the Mok Kinase PWMs, a directory of .csv files or a PWMRegistry.py bundle
+    # files are read in sorted order, kinase order sets the random streams
+    if cmdResults['MOK'] and os.path.exists(cmdResults['MOK']):
+        try:
+            with monitor.phase('load'):
+                kinases = pwr.load(cmdResults['MOK'], pseudocount=pseudocount)
+        except ValueError as err:
+            print('\n\tERROR: kinase PWMs %s, %s\n' %(cmdResults['MOK'], err))
             sys.exit(1)
+    else:
+        print('\n\tERROR:  Mok_kinase_PWMs path not found ')
+        print('\tCheck path and try again\n' )
+        cmdparser.print_help()
+        sys.exit(1)
             
+    # Get the shard of a run split over cluster jobs, i/N
+    if cmdResults['SHARD']:
+        try:
+            shard = tuple(int(x) for x in cmdResults['SHARD'].split('/'))
+        except ValueError:
+            shard = ()
+        if len(shard) != 2 or not 0 <= shard[0] < shard[1]:
+            print('\n\tERROR: --shard is i/N with 0 <= i < N, i.e. 3/100\n')
+            sys.exit(1)
+        if not cmdResults['SEED'] or iterations <= 1 or cmdResults['ADAPT'] or cmdResults['GAMMA']:
+            print('\n\tERROR: --shard splits a shuffle run (-i > 1, no -a or -g) and every shard needs the same seed (-s)\n')
+            sys.exit(1)
+    else:
+        shard = (0, 1)
+        
     # Get output directory, if missing use default
     if cmdResults['OUT']:
         outDir = cmdResults['OUT']
@@ -292,22 +363,101 @@ def main():
             os.mkdir('Kullback-Leibler')
         currDir = os.getcwd()
         outDir = currDir + '/Kullback-Leibler/'        
+    if shard[1] > 1:
+        outDir = os.path.join(outDir, 'shard_%d_of_%d' %shard, '')
+        os.makedirs(outDir, exist_ok=True)
+        
+    # a killed shuffle run started again without a seed resumes with the seed it drew
+    state = kle.loadCheckpoint(outDir)
+    if state is not None and not cmdResults['SEED']:
+        seed = state['params']['seed']
         
-    dfs_lst = []
-    for filename in filenames:
-        dfs_lst.append(pd.read_csv(filename, sep=","))
+    # Get the offset search window, 0 compares the PWMs position for position
+    if cmdResults['SHIFT']:
+        maxShift = int(cmdResults['SHIFT'])
+    else:
+        maxShift = 0
+    width = min(kinases.width, modules.width)
+    if not 0 <= maxShift < width:
+        print('\n\tERROR: --shift is 0 to %d, the PWMs compared have %d positions\n' %(width - 1, width))
+        sys.exit(1)
+        
+    # Get the comparison metric
+    metric = cmdResults['METRIC'] if cmdResults['METRIC'] else 'kl'
+    if metric not in kle.Metrics:
+        print('\n\tERROR: unknown metric %s, use one of %s\n' %(metric, ', '.join(sorted(kle.Metrics))))
+        sys.exit(1)
+        
+    engine = kle.KLEngine(kinases, modules, maxShift, metric=metric)
+    if kinases.width != modules.width:
+        print('Kinase PWM width %d, module PWM width %d, scoring the central %d positions'
+              %(kinases.width, modules.width, engine.width))
+
+    # record the seed with the output
+    writeSeed(outDir, seed, iterations, maxShift, metric)
+    print('Random seed: %d' %(seed))
     
-    jobs = []          # list of jobs
+    # best offset of every unshuffled kinase-module pair
+    if maxShift:
+        engine.scoreTable().to_csv(outDir + 'best_offsets.txt', sep='\t', index=False)
     
-    for i in range(0,procs):
-        process = multiprocessing.Process(target=runShuffle, args=(iterations,DF_CompareTo_lst, dfs_lst, str(i), outDir) )
-        jobs.append(process)
-    # start the jobs
-    for j in jobs:
-        j.start()
-    # ensure all of the process have finished.
-    for j in jobs:
-        j.join()
+    # shuffled kinase PWM cache
+    if cmdResults['CACHE']:
+        cacheSize = float(cmdResults['CACHESIZE']) if cmdResults['CACHESIZE'] else 1024
+        cache = kle.ShuffleCache(cmdResults['CACHE'], int(cacheSize * 1024 * 1024))
+    else:
+        cache = None
+        
+    # profile the main process, Pool workers are separate processes and not included
+    profiler = cProfile.Profile() if cmdResults['PROFILE'] else None
+    if profiler is not None:
+        profiler.enable()
+        
+    if cmdResults['GAMMA']:
+        threshold = float(cmdResults['THRESH']) if cmdResults['THRESH'] else 0.05
+        runApprox(int(cmdResults['GAMMA']), engine, outDir, seed, threshold, cmdResults['COMPARE'], cache, monitor)
+    elif cmdResults['ADAPT'] and iterations > 1:
+        confidence = float(cmdResults['CONF']) if cmdResults['CONF'] else 0.99
+        runAdaptive(iterations, engine, outDir, seed, procs, float(cmdResults['ADAPT']), confidence, cache, monitor)
+    elif iterations > 1:
+        params = { 'kinases'     : engine.kinases,
+                   'modules'     : engine.modules,
+                   'iterations'  : iterations,
+                   'seed'        : seed,
+                   'blockSize'   : kle.BlockSize,
+                   'metric'      : metric,
+                   'shift'       : maxShift,
+                   'pseudocount' : pseudocount,
+                   'binary'      : bool(cmdResults['BINARY']) }
+        if shard[1] > 1:
+            params['shard'] = list(shard)
+        interval   = float(cmdResults['CHECKPOINT']) if cmdResults['CHECKPOINT'] else 60.0
+        checkpoint = kle.Checkpoint(outDir, params, interval)
+        try:
+            resumed = checkpoint.resume()
+        except ValueError as err:
+            print('\n\tERROR: %s, remove it or use another output directory\n' %(err))
+            sys.exit(1)
+        if checkpoint.complete:
+            print('Shuffle run in %s is already complete' %(outDir))
+        else:
+            if resumed:
+                print('Resuming from checkpoint, %d blocks already done' %(len(checkpoint.done)))
+            runShuffle(iterations, engine, outDir, seed, procs, cmdResults['BINARY'], cache, monitor, checkpoint, shard)
+    else:
+        runShuffle(iterations, engine, outDir, seed, procs, cmdResults['BINARY'], cache, monitor)
+        
+    if cache is not None:
+        cache.prune()
+        
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(cmdResults['PROFILE'])
+        print('Profile written to %s, view with python -m pstats %s' %(cmdResults['PROFILE'], cmdResults['PROFILE']))
+        
+    # timings, throughput and peak memory of the run
+    with open(outDir + 'run_summary.json', 'w') as out:
+        json.dump(monitor.summary(), out, indent=1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
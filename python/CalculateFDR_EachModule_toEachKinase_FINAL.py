@@ -1,154 +1,104 @@
-import pandas as pd 
+import argparse
 import glob
-import itertools
+import os
+import pandas as pd
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))       # KLEngine.py lives in the repository root
+import KLEngine as kle
 
 
 
-''' This script is calculates an FDR for each Mok Kinase to each Module. 
+''' This script is calculates an FDR for each Mok Kinase to each Module.
 The script takes the 63,000 shuffled Mok et al kinase-module scores and determines for each kinase where that unshuffled kinase-module score
 falls in the shuffled distribution.For example,if a Kinase has an shuffled score of 14.7 to a module , and only 63 unshuffled kinase-module scores
 are below that value, then this kinase has has an FDR of 0.1% (63/63,000 scores). We can then use the FDR values for all kinases to a module
-to determine an FDR cutoff for that module. Thus, we can say only these x kinases are a good match to the module. Calling an FDR threshold is 
+to determine an FDR cutoff for that module. Thus, we can say only these x kinases are a good match to the module. Calling an FDR threshold is
 done manually by the user.
-'''
-
-
-
-#Read in input files (which are the non-shuffled scores for all Mok kinases compared to each Module) 
-
-path=r"/Users/mmacgilvray18/Desktop/ClassA_NoShuffle_KL_Unwanted_Characters_Removed/"
-filenames = glob.glob(path + "*.csv")
-
-
-dfs_input_lst = []
-for filename in filenames:
-    dfs_input_lst.append(pd.read_csv(filename, sep=","))
-
-
-def Concatenate_Input_DFs(): 
-    ''' Append the dataframes to one another '''
-    EmptyDF = pd.DataFrame() 
-    for df in dfs_input_lst:  
-        df=df.copy() 
-        EmptyDF=EmptyDF.append(df) 
-
-Input=Concatenate_Input_DFs()
-Input=Input[['Scores','Kinase','Module']]
-
-
-
-
-
-def SplitInput_df_byModule():
-    ''' Function splits the input dataframe, by Module, into independent dataframes'''
-    DF_Input_lst =[]
-    for Module in Input['Module'].unique():
-        DF=Input.loc[Input['Module']==Module]
-        DF_Input_lst.append(DF)
-    return DF_Input_lst
-
-DF_Input_lst=SplitInput_df_byModule()
-
-
-
-# Importing the Shuffled Mok kinase -Module Score csv files individually and creating dataframes
-path=r"/Users/mmacgilvray18/Desktop/Module_PWMs_KLD_Output_ClassA_Unwanted_Characters_Removed/"
-filenames = glob.glob(path + "*.csv")
-#print (filenames)
-
-dfs_lst = []
-for filename in filenames:
-    dfs_lst.append(pd.read_csv(filename, sep=","))
-
-dfs_lst2=[]
-for df in dfs_lst:
-    df=df[['Scores','Kinase', 'Module']]
-    dfs_lst2.append(df)
-
-
-
-
-def CountScores_Below():
-    '''Function is calculating the number of scores in the shuffled distribution below a non-shuffled Kinase_Module score '''
-    Final_DFs_lst=[]   #
-    for DF_shuffled in dfs_lst2:  
-        DF_shuffled=DF_shuffled.copy()
-       
-        for df_noShuffle in DF_Input_lst:  
-            df_noShuffle=df_noShuffle.copy()
-       
-            if df_noShuffle['Module'].unique().all() == DF_shuffled['Module'].unique().all():      # if all of the values match in the module column for each df, then and only then, perform the below steps
-                Input_Score_lst=df_noShuffle['Scores'].tolist()  
-                
-                Scores_lst=[]  
-                for score in Input_Score_lst: 
-                    Scores_lst_individual=[]
-                    num_smaller_items = (DF_shuffled['Scores']<score).sum()                        # create a variable that is the sum of all scores below the score in the Shuffled_Scores dataframe
-                 
-                    Scores_lst_individual.append(num_smaller_items)                                # append the number of scores below a given kinase-module score to the individual list.
-                    Scores_lst.append(Scores_lst_individual)                                       # append the individual scores to a list.
-                    merged = list(itertools.chain(*Scores_lst))                                    # Flatten the list of lists. 
-                    
-                df_noShuffle['Counts_Less_Than']=merged
-                df_noShuffle['Number_of_Scores']=len(DF_shuffled)                                  # take all of the summed scores, one per kinase from the kinase-module no-shuffle dataframe, and create a new column.
-                Final_DFs_lst.append(df_noShuffle)  
-    return Final_DFs_lst
-
-DFs_with_CountsBelow_lst=CountScores_Below()
-
-            
-   
-    
-def Calculate_FDR():
-    ''' Function calculates an FDR value by dividing the number of shuffled scores for a kinase-module
-    that are smaller than the non-shuffled kinase-module score by all shuffled scores (63,000)  '''
-    DFs_with_CountsBelow_lst2=[]
-    for DF in DFs_with_CountsBelow_lst:
-        DF['FDR']=DF['Counts_Less_Than']/DF['Number_of_Scores']
-        DF=DF.sort(['FDR'], ascending=[True])
-        DFs_with_CountsBelow_lst2.append(DF)
-    return DFs_with_CountsBelow_lst2
- 
- 
-DFs_with_CountsBelow_lst2=Calculate_FDR()
-
-
-
-# Import the kinases not in the Mok et al dataset.
-Kinases_Not_In_Mok_DF=pd.read_csv('/Users/mmacgilvray18/Desktop/Kinases_Not_In_Mok.csv')
-
-
-def ConcatenateDFs_with_Kinases_Not_In_Mok():
-    '''Function adds the kinases not in the Mok et al dataset to the dataframes for each module'''
-    DFs_with_CountsBelow_lst3=[]
-    for DF in DFs_with_CountsBelow_lst2:
-        DF=DF.copy()
-        FinalDF=DF.append(Kinases_Not_In_Mok_DF)
-        DFs_with_CountsBelow_lst3.append(FinalDF)
-    return DFs_with_CountsBelow_lst3
-
-DFs_with_CountsBelow_lst3=ConcatenateDFs_with_Kinases_Not_In_Mok() 
-print (DFs_with_CountsBelow_lst3)   
-
-
-
-def ConcatenateDFs(): 
-    '''Function appends all of the dataframes, for each module, together into one dataframe''' 
-    EmptyDF = pd.DataFrame() 
-    for df in DFs_with_CountsBelow_lst3: 
-        df=df.copy() 
-        EmptyDF=EmptyDF.append(df) 
-    return EmptyDF
-
-Final=ConcatenateDFs()
-
 
+The FDR is computed by KLEngine.fdrTable, the same code kullback-Leibler.py and the notebook use. The shuffled scores are read from
+    - a binary score store, the output directory of a kullback-Leibler.py -b run (null_scores.npy + null_scores.json)
+    - the output directory of a kullback-Leibler.py --shard run, its shard_*_of_* directories are merged into a score store first
+      (what kullback-Leibler.py merge -o <directory> does)
+    - a kullback-Leibler.py text run directory, one <module>.csv file per module holding a (score, 'kinase') tuple per line
+    - a directory of .csv files with Scores, Kinase and Module columns
+The unshuffled scores (-u) are read in either .csv format.  A directory holding an unfinished checkpointed run (checkpoint.json) is refused.
 
+usage: CalculateFDR_EachModule_toEachKinase_FINAL.py -u <unshuffled .csv directory> -s <shuffled scores> -o <output file>
+                                                     [-k Kinases_Not_In_Mok.csv]
+'''
 
 
-def DF_to_CSV(dataframe, NewFileName): 
-    ''' Write out dataframe as a tab separated file.'''
-    path ='/Users/mmacgilvray18/Desktop/' 
-    dataframe.to_csv (path+NewFileName,sep='\t') 
-    
-DF_to_CSV(Final, 'All_Mok_Kinases_Shuffled1000x_New_Method_ClassA_Modules_FDR_Scores_8_30_16.csv')
+def Read_Score_File(filename):
+    ''' Read one score .csv file into a dataframe with Scores, Kinase and Module columns.  kullback-Leibler.py text output has no header,
+    each line is a (score, 'kinase') tuple and the module is the file name, other files need a Scores,Kinase,Module header. '''
+    with open(filename) as f:
+        first = f.readline()
+    if first.startswith('('):
+        DF = pd.read_csv(filename, sep=",", header=None, names=['Scores','Kinase'], dtype=str)
+        DF['Scores'] = DF['Scores'].str.lstrip('(').astype(float)                                    # (13.25, 'cdc15')
+        DF['Kinase'] = DF['Kinase'].str.strip(" ')")
+        DF['Module'] = os.path.splitext(os.path.basename(filename))[0]
+        return DF
+    DF = pd.read_csv(filename, sep=",")
+    missing = [ col for col in ['Scores','Kinase','Module'] if col not in DF.columns ]
+    if missing:
+        raise ValueError('%s is neither kullback-Leibler.py output nor a csv with Scores, Kinase and Module columns (missing %s)'
+                         %(filename, ', '.join(missing)))
+    return DF[['Scores','Kinase','Module']]
+
+
+def Read_CSV_Dir(path):
+    ''' Read every .csv file of a directory into one dataframe, keeping the Scores, Kinase and Module columns.  Refuses the output of
+    an unfinished checkpointed kullback-Leibler.py run. '''
+    kle.checkComplete(path)
+    filenames = sorted(glob.glob(os.path.join(path, "*.csv")))
+    if not filenames:
+        raise ValueError('no .csv files in %s' %(path))
+    return pd.concat([ Read_Score_File(filename) for filename in filenames ], ignore_index=True)
+
+
+def Load_Null(path):
+    ''' Shuffled scores for each module, dict Module -> array of scores, from a score store, a sharded run or .csv files '''
+    if not os.path.exists(os.path.join(path, kle.StoreManifest)):
+        shardDirs = sorted(glob.glob(os.path.join(path, 'shard_*_of_*')))
+        if shardDirs:
+            kle.mergeShards(shardDirs, path)                                                         # merged store is written next to the shards
+    if os.path.exists(os.path.join(path, kle.StoreManifest)):
+        manifest, scores = kle.loadScoreStore(path)
+        return kle.storeNull(manifest, scores)
+    Shuffled = Read_CSV_Dir(path)
+    return { Module: DF['Scores'].values for Module, DF in Shuffled.groupby('Module') }
+
+
+def Add_Kinases_Not_In_Mok(Final, Kinases_Not_In_Mok_DF):
+    '''Function adds the kinases not in the Mok et al dataset after the kinases of each module'''
+    lst=[]
+    for Module, DF in Final.groupby('Module', sort=False):
+        lst.append(DF)
+        lst.append(Kinases_Not_In_Mok_DF)
+    return pd.concat(lst) if lst else Final
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FDR of each Mok kinase to each Module from the shuffled Kullback-Leibler scores.")
+    parser.add_argument('-u', '--unshuffled', action='store', dest='UNSHUFFLED', required=True, help='Directory of unshuffled score .csv files, Scores,Kinase,Module', metavar='')
+    parser.add_argument('-s', '--shuffled', action='store', dest='SHUFFLED', required=True, help='Shuffled scores, score store or shard run directory, or directory of .csv files', metavar='')
+    parser.add_argument('-k', '--kinases', action='store', dest='KINASES', help='Kinases not in the Mok et al dataset .csv, added to every module', metavar='')
+    parser.add_argument('-o', '--out', action='store', dest='OUT', required=True, help='Output file, tab separated', metavar='')
+    cmdResults = vars(parser.parse_args())
+
+    try:
+        Input=Read_CSV_Dir(cmdResults['UNSHUFFLED'])                                                 # the non-shuffled scores for all Mok kinases compared to each Module
+        Null=Load_Null(cmdResults['SHUFFLED'])
+    except ValueError as err:
+        print('\n\tERROR: %s\n' %(err))
+        sys.exit(1)
+
+    Final=kle.fdrTable(Input, Null)                                                                  # Counts_Less_Than, Number_of_Scores and FDR, sorted by FDR within each module
+    if cmdResults['KINASES']:
+        Final=Add_Kinases_Not_In_Mok(Final, pd.read_csv(cmdResults['KINASES']))
+    Final.to_csv(cmdResults['OUT'], sep='\t')
+
+
+if __name__ == "__main__":
+    main()
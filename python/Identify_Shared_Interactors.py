@@ -1,255 +1,135 @@
+import argparse
+import os
 import pandas as pd
 import numpy as np
-from scipy.stats import hypergeom
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))       # SharedInteractors.py, FDRCorrection.py and BackgroundNetwork.py live in the repository root
+import BackgroundNetwork as bn
+import FDRCorrection as fc
+import SharedInteractors as si
 
 
 ''' This script identifies proteins enriched for interactions with Submodule constituent proteins, based on known interactions in the background network. We call these proteins 'Shared Interactors'. The background network is a protein
-interaction network curated in yeast under mostly nutrient replete conditions that contains 4638 proteins and ~ 25,000 interactions, including directed (ex; kinase-substrate), and 
-non-directed. 
+interaction network curated in yeast under mostly nutrient replete conditions that contains 4638 proteins and ~ 25,000 interactions, including directed (ex; kinase-substrate), and
+non-directed.
 
 Proteins enriched for interactions with Submodule proteins at a 5% FDR, determined by a hypergeometric test and BH correction, are considered shared interactors.
 Shared Interactors represent numerous functional classes, including kinases and phosphatases. Kinase and phosphatase shared interactors represent potential Submodule regulators.
- 
-HyperG function:
-distrib=hypergeom(N,M,n)
-distrib.pmf(m)
 
-N - population size  (4638 unique proteins in the Background network file - phospho_v4_bgnet_siflike_withdirections_Matt_Modified.csv)
-M - total number of successes  (# of interactions for a given protein. ie. Protein A has 200 known interactions in the background network).
-n - the number of trials (also called sample size) -  ie. (Number of proteins that reside within a submdoule)
-m - the number of successes - for example: Protein A, a shared interactor, has 35 interactions with proteins in Submodule B. 
+The correction (FDRCorrection.py) is the standard step-up Benjamini-Hochberg procedure over all submodules by default, Benjamini-Yekutieli (-k by), Storey
+q-values (-k storey) and a correction within each submodule (-m submodule) are available, the FDR Q is set with -q.
 
-'''
+The shared interactors of all submodules are found at once by SharedInteractors.py, one sparse matrix product of the submodule x protein membership and
+the protein x protein background network adjacency gives m for every submodule and interactor.
 
-Submodule_DF = pd.read_csv('/Users/mmacgilvray18/Desktop/Submodule_constituents.csv')                                                                       # File that contains Submodule names and their protein constituents
-#print (Submodule_DF.head(5))
-BgNet= pd.read_csv('/Users/mmacgilvray18/Desktop/Background_Network.csv')                                                                                   # Background network of protein interactions
-#print (BgNet.head(5))
-Num_Prot_Inter = pd.read_csv ('/Users/mmacgilvray18/Desktop/Number_Interactions_Each_Protein.csv')                                              # Number of protein interactions for each protein in the background network
-Annotation_DF = pd.read_csv('/Users/mmacgilvray18/Desktop/Annotation_dashes_removed_for_SI_renaming.csv')                                                   # Yeast protein annotation file
-
-  
-Submodule_List=Submodule_DF['Submodule'].unique().tolist()                                                                                                  # Send the Submodules to a list, but filter out duplicates, which there will be many, since the Submodules will have been found in many proteins.
+HyperG function, the upper tail P(X >= m) for all shared interactors at once (SharedInteractors.hyperTail):
+hypergeom.sf(m-1,N,M,n)
 
+N - population size  (the number of unique proteins in the Background network file, 4638 in phospho_v4_bgnet_siflike_withdirections_Matt_Modified.csv)
+M - total number of successes  (# of interactions for a given protein. ie. Protein A has 200 known interactions in the background network).
+n - the number of trials (also called sample size) -  ie. (Number of proteins that reside within a submdoule)
+m - the number of successes - for example: Protein A, a shared interactor, has 35 interactions with proteins in Submodule B.
 
-dicOrfs={}
-for Submodule in Submodule_List:                                                                                                                            # Key (Submodule), Value (Yeast ORFs that are Submodule constituents). Filter ORFs found twice to single occurence (important for enrichment analysis)
-    dicOrfs[Submodule]=(Submodule_DF.loc[Submodule_DF['Submodule'] == Submodule])['ORF'].unique().tolist()
-        
+N and M are taken from the background network itself (BackgroundNetwork.py), M is the number of distinct interaction partners of a protein in either
+direction. The network index is cached next to the network file (<network>.index.npz) and rebuilt when the file changes.
 
-dicOrfsCounts={}  
-for k,v in dicOrfs.items():  
-    if k not in dicOrfsCounts:  
-        value=len(v)            
-        dicOrfsCounts[k]=value
+usage: Identify_Shared_Interactors.py -s Submodule_constituents.csv -b Background_Network.csv
+                                      -a Annotation_dashes_removed_for_SI_renaming.csv -o <output directory>
+                                      [-q 0.05] [-k bh|by|storey] [-m global|submodule] [-l]
+'''
 
 
-        
-df_Submodule_Size=pd.DataFrame(list(dicOrfsCounts.items()),                                                                                                  # convert dict to dataframe.
-                      columns=['Submodule','n'])
+def DF_to_CSV(dataframe, path, NewFileName):
+    ''' Define a function that writes out a dataframe as CSV'''
+    dataframe.to_csv(os.path.join(path, NewFileName))
 
 
-#-----------------------------------------------------------------------------------------------------------------------------------------------------------------------
-
-def DF_to_TSV(dataframe, NewFileName): 
-    ''' Define a function that writes out a dataframe as TSV'''
-    path ='/Users/mmacgilvray18/Desktop/' 
-    dataframe.to_csv (path+NewFileName,sep='\t')
-
-#-----------------------------------------------------------------------------------------------------------------------------------------------------------------------
- 
-def SliceDataframe():
-    ''' For each Submodule identify all proteins that interact with the Submodule proteins in the backgroudn network '''
-    lst = []
-    for key in dicOrfs.keys():                                                                                                                             #Select the key, which is a Submodule, from the dict
-        CurrentDF=BgNet.copy() 
-        x=CurrentDF[CurrentDF['Protein1'].isin(dicOrfs[key])].rename(columns={'Protein1':'Submodule_Containing_Proteins', 'Protein2':'Possible_Shared_Interactors'})                              #Create a new dataframe that is a slice of the salt background network, and only contains proteins that were passed in "dicOrfs[key]". At the same time, rename the columns                                
-        x['Submodule']=key 
-        lst.append(x)
-        
-    return lst
-
-Sliced_dataframe_list= SliceDataframe()
-    
-      
-def Add_n():    
-    ''' Function adds 'n', the number of proteins in the Submodule, to each dataframe'''
-    lst= []
-    for df in Sliced_dataframe_list:
-        NewDF=df.merge(df_Submodule_Size)
-        lst.append(NewDF)
-        
-    return lst
-
-Sliced_dataframe_list= Add_n()
-
-            
-def Identify_Shared_Interactors():
-    ''' Function identifies proteins that interact with at least 2 protein constituents of each submodule'''
-    
-    lst=[] 
-    for df in Sliced_dataframe_list: 
-        NewDF=df.copy()
-        NewDF2=NewDF[NewDF.duplicated(['Possible_Shared_Interactors'], take_last=True)| NewDF.duplicated(['Possible_Shared_Interactors'])]                  # Only retain proteins that interact with at least 2 submodule protein constituents
-        x=NewDF2.sort('Possible_Shared_Interactors', ascending=True) 
-        lst.append(x)
-       
-    return lst
-
-Shared_Interactors_lst=Identify_Shared_Interactors()
-
-
-def AppendDFs_that_Contain_AllSharedInteractors_and_their_targets():
-    ''' Function appends all submodules and their shared interactors together into a single file'''
-    EmptyDF = pd.DataFrame() 
-    for df in Shared_Interactors_lst:  
-        df=df.copy() 
-        EmptyDF=EmptyDF.append(df)
-    return EmptyDF
-
-SI_andTargets=AppendDFs_that_Contain_AllSharedInteractors_and_their_targets()
-
-
-SI_andTargets_FINAL=pd.merge(left=SI_andTargets, right=Annotation_DF, how='left',
-                              left_on='Possible_Shared_Interactors', right_on='systematic_name_dash_removed')                                               # complete a merge so I can get the dashes back in the names, which are not included in the background network
-del SI_andTargets_FINAL['Possible_Shared_Interactors']                                                                                                      # drop because  lacks the dashes which are needed for the correct naming convention
-del SI_andTargets_FINAL['systematic_name_dash_removed']                                                                                                     # drop because carried over from the merge
-del SI_andTargets_FINAL['Directed']
-
-SI_andTargets_FINAL.columns = ['Submodule_Containing_Proteins', 'Interaction', 'Submodule', 'n','Possible_Shared_Interactors']                        # rename columns
-
-
-
-DF_to_CSV(SI_andTargets_FINAL, 'SI_Identification_NaCl_SubmoduleS_Possible_SIs_and_Targets_Dashes_Removed_4638_proteins_01_18_17_0.1_FDR.csv')              # All interactions between SIs and their submodule constituent proteins. No enrichment at this step.
+def Restore_Dashes(dataframe, Annotation_DF, column):
+    ''' Complete a merge with the annotation file to get the dashes back in the protein names, which are not included in the background network.
+    The dashed name replaces column and is moved to the end of the dataframe. '''
+    NewDF=pd.merge(left=dataframe, right=Annotation_DF, how='left', left_on=column, right_on='systematic_name_dash_removed')
+    Dashed=[ col for col in Annotation_DF.columns if col != 'systematic_name_dash_removed' ][0]
+    NewDF=NewDF.drop(columns=[column, 'systematic_name_dash_removed', 'Directed'], errors='ignore')
+    return NewDF.rename(columns={Dashed:column})
 
 
 #-----------------------------------------------------------------------------------------------------------------------------------------------------------------------
 ''' Preparing dataframe for Hypergeometric test'''
 
-def Add_N_and_m():
-    ''' Function adds 'N' and calculates 'm' values, which are inputs for the hypergeometric test, to the datframe'''
-    lst=[]
-    for df in Shared_Interactors_lst:
-        NewDF=df.copy()
-        NewDF['N'] = 4638                                                                                                                                   # of proteins in the background network
-        NewDF['m'] = NewDF.groupby('Possible_Shared_Interactors')['Possible_Shared_Interactors'].transform('count')
-        lst.append(NewDF)
-    
-    return lst
-
-Dataframes_list_with_n_N_m=Add_N_and_m()
-
-
-#-----------------------------------------------------------------------------------------------------------------------------------------------------------------------
+def Add_N_and_M(Shared, Targets, BgNet):
+    ''' Function adds 'N' and 'M' (the total number of interactions for each Shared Interactor protein in the background network), the inputs for the
+    hypergeometric test besides n and m, and the first submodule protein and interaction of each shared interactor. Both come from the background network index.'''
+    First=Targets.drop_duplicates(['Submodule', 'Possible_Shared_Interactors']).rename(columns={'Possible_Shared_Interactors':'Shared_Interactor'})
+    NewDF=Shared.merge(First[['Submodule', 'Shared_Interactor', 'Submodule_Containing_Proteins', 'Interaction']], on=['Submodule', 'Shared_Interactor'])
+    NewDF['N'] = BgNet.N                                                                                                                                    # of proteins in the background network
+    NewDF['M'] = BgNet.degree(NewDF['Shared_Interactor'])                                                                                                   # interaction partners of each shared interactor
+    return NewDF[['M', 'Submodule_Containing_Proteins', 'Interaction', 'Submodule', 'n', 'N', 'm', 'Shared_Interactor']]
 
 
-def Drop_dups():
-    ''' For each dataframe, which contains a single submodule, it's protein constituents, and shared interactors, drop duplicate entries for identified SI proteins
-    . This leaves a single entry for each shared interactor protein. '''
-    lst=[]
-    for df in Dataframes_list_with_n_N_m:
-        NewDF=df.copy()
-        Final_DF=NewDF.drop_duplicates('Possible_Shared_Interactors')
-        Final_DF=Final_DF.rename(columns={'Possible_Shared_Interactors':'Shared_Interactor'})
-        lst.append(Final_DF)
-        
-    return lst
-
-Drop_Dups_lst=Drop_dups()
-
-
-def Return_M():
-    ''' Function identifies 'M' (the total number of interactions for each Shared Interactor protein in the background network) and adds that number
-    to the dataframe'''
-    lst=[]
-    for df in Drop_Dups_lst:
-        NewDF=df.copy()
-        NewDF2=df.copy()
-        NewDF_lst=NewDF['Shared_Interactor'].tolist()                                                                                                            # place all proteins in the 'Shared_Interactor' column in a list 
-        Shared_Interactors=Num_Prot_Inter[Num_Prot_Inter['Protein'].isin(NewDF_lst)].rename(columns={'Protein':'Shared_Interactor', 'Total':'M'})
-        Shared_Interactor_merge=Shared_Interactors.merge(NewDF2, on='Shared_Interactor')
-        Shared_Interactor_merge=Shared_Interactor_merge.sort('Shared_Interactor', ascending=True)
-        lst.append(Shared_Interactor_merge)
-        
-    return lst
-
-Return_M_lst=Return_M()
-
 #-----------------------------------------------------------------------------------------------------------------------------------------
-def hyper(N,M,n,m): 
-    ''' Function defines the parameters for a hypergeometric test that returns a p-value representing the chances of identifying >= x, where x is the number of successes '''  
-    frozendist=hypergeom(N,M,n)
-    ms=np.arange(m, min(n+1, M+1))
-    rv=0;
-    for single_m in ms: rv=rv+frozendist.pmf(single_m)
-    return rv
-
-def run_hyper():
-    ''' Function calls the hypergeometric function above  on each shared interactor for each submodule'''
-    lst=[]
-    for df in Return_M_lst:
-        if not df.empty:
-            NewDF=df.copy()
-            NewDF['p-value'] = NewDF.apply(lambda row: hyper(row['N'], row['M'], row['n'], row['m']), axis=1)
-            lst.append(NewDF)
-        
-    return lst 
-
-run_hyper_lst=run_hyper()
-
-#-----------------------------------------------------------------------------------------------------------------------------------------------------------------------
-def AppendDFs():
-    ''' Append DFs for each submodule and it's SIs together into a single DF'''   
-    EmptyDF = pd.DataFrame() #
-    for df in run_hyper_lst: 
-        df=df.copy() 
-        EmptyDF=EmptyDF.append(df)
-    return EmptyDF
+def run_hyper(NewDF, log=False):
+    ''' Function runs the hypergeometric test on every shared interactor of every submodule at once, the p-value is the chance of identifying >= m successes.
+    With log the natural log of the p-value is added as well, it keeps p-values too small for a float apart. '''
+    NewDF=NewDF.copy()
+    if log:
+        NewDF['log_p-value'] = si.hyperTail(NewDF['N'], NewDF['M'], NewDF['n'], NewDF['m'], log=True)
+        NewDF['p-value'] = np.exp(NewDF['log_p-value'])
+    else:
+        NewDF['p-value'] = si.hyperTail(NewDF['N'], NewDF['M'], NewDF['n'], NewDF['m'])
+    return NewDF
 
-Final=AppendDFs()
 
 #-----------------------------------------------------------------------------------------------------------------------------------------------------------------------
-''' Prepping for Benjamini Hochberg procedure. Below code is ranking p-values from 1 to n based on lowest to highest p-value score'''
-
-Final=Final.sort(['p-value'],ascending=[True])                                                                                              # Sort p-values from lowest to highest
-Final_resetIndex=Final.reset_index()                                                                                                        # Reset the index after the sort
-Final_resetIndex.index +=1                                                                                                                  # start numbering at 1 for index
-
-       
-NewDF=Final_resetIndex
-NewDF_Allp_values=Final_resetIndex
-NewDF=NewDF[['p-value']]                                                                                                                    # select only the p-value column of the dataframe 
-NewDF_dropdups=NewDF.drop_duplicates('p-value')                                                                                             # drop duplicate p-values
-NewDF_dropdups=NewDF_dropdups.reset_index()                                                                                                 # reset the index
-NewDF_dropdups.index +=1                                                                                                                    # start numbering at 1 for index
-NewDF_dropdups['Rank(i)'] = NewDF_dropdups.index                                                                                            # #Add a rank column that will be filled with index values. 
-NewDF_dropdups=NewDF_dropdups.drop('index', 1)                                                                                              # Drop the additional column 'index' that is not sorted.
-NewDF_merge=NewDF_Allp_values.merge(NewDF_dropdups, on='p-value')                                                                           # create a new dataframe that is a merge of the dataframe with all p-values, and the dataframe with unique p-values and their ranks. 
-NewDF_merge=NewDF_merge.drop('index',1)                                                                                                     # drop the index that was added from the merge. This leaves all p-values ordered from lowest to highest with their ranking.
-     
-
-
-
-'''Add parameters necessary for completing Benjamini-Hochberg procedure '''
-
-NewDF=NewDF_merge
-NewDF['m_(number_of_tests)']=(len(NewDF))                                                                                                   # Add 'm (number of tests)' column 
-NewDF['Q_(FDR)']=0.05                                                                                                                       # Add Q (FDR) column. This can be changed manually.
-NewDF['(i/m)Q']=((NewDF['Rank(i)']/NewDF['m_(number_of_tests)'])*NewDF['Q_(FDR)'])                                                          # add the (i/m)Q column 
-NewDF['BH_significant']=NewDF.apply(lambda x: 1 if x['p-value']<x['(i/m)Q'] else 0, axis=1)                                                 # Identify which proteins are  significant. 
-NewDF=pd.merge(left=NewDF, right=Annotation_DF, how='left', left_on='Shared_Interactor', right_on='systematic_name_dash_removed')           # complete a merge to recover dashed version of YORFs
-del NewDF['Shared_Interactor'] 
-del NewDF['systematic_name_dash_removed']
-del NewDF['Directed']
-NewDF.columns = ['M','Submodule_Containing_Proteins', 'Interaction', 'Submodule', 'n','N','m','p-value','Rank(i)', 'm_(number_of_tests)', 'Q_(FDR)','(i/m)Q','BH_significant', 'Shared_Interactor'] # rename columns
-
-
-DF_to_CSV(NewDF, 'SIs_NaCl_Network_SubmoduleS_01_18_17_FDR_0.05_BH_done_At_Once_sig_and_not_Dashes_Removed_4638_Nodes_background_Network.csv') # Write out final file with enriched shared interactors for each submodule
-
-
-
-
-
-
-
-
+def Benjamini_Hochberg(Final, Q, method='bh', mode='global'):
+    ''' Multiple testing correction of the p-values (FDRCorrection.py), Benjamini-Hochberg by default. Ranks p-values from 1 to m based on lowest to highest
+    p-value score, over all submodules at once (mode global) or within each submodule (mode submodule), and adds the parameters of the procedure.
+    Tied p-values get the same q-value, a shared interactor is significant when its q-value is <= Q. '''
+    groups=Final['Submodule'].values if mode == 'submodule' else None
+    order, rank, tests=fc.rankTests(Final['p-value'].values, groups)
+    NewDF=Final.iloc[order].reset_index(drop=True)                                                                                  # Sort p-values from lowest to highest
+    NewDF['Rank(i)']=rank                                                                                                           # Add a rank column, numbering starts at 1
+    NewDF['m_(number_of_tests)']=tests                                                                                              # Add 'm (number of tests)' column
+    NewDF['Q_(FDR)']=Q                                                                                                              # Add Q (FDR) column.
+    NewDF['(i/m)Q']=((NewDF['Rank(i)']/NewDF['m_(number_of_tests)'])*NewDF['Q_(FDR)'])                                              # add the (i/m)Q column
+    NewDF['q-value']=fc.adjust(NewDF['p-value'].values, method, None if groups is None else NewDF['Submodule'].values)              # adjusted p-values
+    NewDF['BH_significant']=(NewDF['q-value'] <= Q).astype(int)                                                                     # Identify which proteins are  significant.
+    return NewDF
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Identify shared interactors of submodules in the background network.")
+    parser.add_argument('-s', '--submodules', action='store', dest='SUBMODULES', required=True, help='Submodule constituents .csv, Submodule,ORF', metavar='')
+    parser.add_argument('-b', '--background', action='store', dest='BACKGROUND', required=True, help='Background network .csv, Protein1,Protein2,Interaction,Directed', metavar='')
+    parser.add_argument('-a', '--annotation', action='store', dest='ANNOTATION', required=True, help='Annotation .csv, systematic_name_dash_removed and the dashed name', metavar='')
+    parser.add_argument('-o', '--out', action='store', dest='OUT', help='Output directory, (current directory)', metavar='')
+    parser.add_argument('-q', '--fdr', action='store', dest='FDR', help='FDR Q, (0.05)', metavar='')
+    parser.add_argument('-k', '--method', action='store', dest='METHOD', help='FDR correction method, bh, by or storey, (bh)', metavar='')
+    parser.add_argument('-m', '--mode', action='store', dest='MODE', help='Correct over all submodules (global) or within each submodule (submodule), (global)', metavar='')
+    parser.add_argument('-l', '--log', action='store_true', dest='LOG', help='Add the log_p-value column, computed in log space for tiny p-values')
+    cmdResults = vars(parser.parse_args())
+
+    path = cmdResults['OUT'] if cmdResults['OUT'] else '.'
+    Q = float(cmdResults['FDR']) if cmdResults['FDR'] else 0.05
+    method = cmdResults['METHOD'] if cmdResults['METHOD'] else 'bh'
+    mode = cmdResults['MODE'] if cmdResults['MODE'] else 'global'
+    if method not in fc.Methods or mode not in ['global', 'submodule']:
+        print('\n\tERROR: the method is one of %s and the mode global or submodule\n' %(', '.join(fc.Methods)))
+        sys.exit(1)
+
+    Submodule_DF = pd.read_csv(cmdResults['SUBMODULES'])                             # File that contains Submodule names and their protein constituents
+    BgNet = bn.load(cmdResults['BACKGROUND'])                                        # Background network of protein interactions, indexed once (cached)
+    Annotation_DF = pd.read_csv(cmdResults['ANNOTATION'])                            # Yeast protein annotation file
+
+    Shared=si.sharedInteractors(Submodule_DF, BgNet)                                                 # proteins that interact with at least 2 protein constituents of each submodule
+    Targets=si.interactorTargets(Submodule_DF, BgNet, Shared)
+
+    SI_andTargets_FINAL=Restore_Dashes(Targets, Annotation_DF, 'Possible_Shared_Interactors')
+    DF_to_CSV(SI_andTargets_FINAL, path, 'SI_Identification_NaCl_SubmoduleS_Possible_SIs_and_Targets_Dashes_Removed_4638_proteins_01_18_17_0.1_FDR.csv')  # All interactions between SIs and their submodule constituent proteins. No enrichment at this step.
+
+    Final=run_hyper(Add_N_and_M(Shared, Targets, BgNet), cmdResults['LOG'])
+    NewDF=Restore_Dashes(Benjamini_Hochberg(Final, Q, method, mode), Annotation_DF, 'Shared_Interactor')
+    DF_to_CSV(NewDF, path, 'SIs_NaCl_Network_SubmoduleS_01_18_17_FDR_0.05_BH_done_At_Once_sig_and_not_Dashes_Removed_4638_Nodes_background_Network.csv') # Write out final file with enriched shared interactors for each submodule
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Program: test_FDRCorrection.py
+
+Purpose: Check FDRCorrection, BH, BY and Storey q-values on a hand computed vector,
+         against scipy, per group, with ties and with NaN p-values.
+         Run with  python -m pytest tests/
+"""
+import numpy as np
+import os
+import pytest
+import sys
+from scipy.stats import false_discovery_control
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))       # modules live in the repository root
+import FDRCorrection as fc
+
+# sorted 0.01, 0.03, 0.04, 0.2, m = 4
+PValues = np.array([ 0.01, 0.04, 0.03, 0.2 ])
+
+# p m / i = 0.04, 0.06, 0.0533, 0.2, running minimum from the top
+BH = np.array([ 0.04, 0.16 / 3, 0.16 / 3, 0.2 ])
+
+# BH times c(4) = 1 + 1/2 + 1/3 + 1/4
+BY = BH * (1 + 1 / 2.0 + 1 / 3.0 + 1 / 4.0)
+
+# BH times pi0, no p-value above lambda 0.5, counted as 1: 1 / (4 (1 - 0.5)) = 0.5
+Storey = BH * 0.5
+
+
+@pytest.mark.parametrize('method, expected', [ ('bh', BH), ('by', BY), ('storey', Storey) ])
+def test_hand_computed(method, expected):
+    assert np.allclose(fc.adjust(PValues, method), expected)
+
+
+@pytest.mark.parametrize('method', [ 'bh', 'by' ])
+def test_matches_scipy(method):
+    pvalues = np.random.default_rng(3).random(200) ** 3
+    assert np.allclose(fc.adjust(pvalues, method), false_discovery_control(pvalues, method=method))
+
+
+def test_storey_pi0():
+    # 2 of 4 p-values above 0.5, pi0 = 2 / (4 * 0.5) = 1, the BH values
+    pvalues = np.array([ 0.001, 0.02, 0.6, 0.9 ])
+    assert np.allclose(fc.adjust(pvalues, 'storey'), fc.adjust(pvalues, 'bh'))
+
+
+def test_groups_are_separate_families():
+    pvalues = np.array([ 0.01, 0.5, 0.04, 0.02, 0.03, 0.9 ])
+    groups  = np.array([ 'a', 'b', 'a', 'b', 'a', 'b' ])
+    for method in fc.Methods:
+        grouped = fc.adjust(pvalues, method, groups)
+        for name in 'ab':
+            assert np.allclose(grouped[groups == name], fc.adjust(pvalues[groups == name], method))
+
+
+def test_rank_tests_groups():
+    order, rank, tests = fc.rankTests([ 0.3, 0.1, 0.2, 0.05 ], [ 'x', 'y', 'x', 'y' ])
+    assert list(order) == [ 2, 0, 3, 1 ]
+    assert list(rank)  == [ 1, 2, 1, 2 ]
+    assert list(tests) == [ 2, 2, 2, 2 ]
+
+
+def test_ties_share_a_value():
+    pvalues = np.array([ 0.02, 0.01, 0.02, 0.02, 0.5 ])
+    adjusted = fc.adjust(pvalues)
+    assert adjusted[0] == adjusted[2] == adjusted[3]
+    assert np.allclose(adjusted, false_discovery_control(pvalues))
+    significant = fc.significant(pvalues, 0.025)
+    assert significant[0] == significant[2] == significant[3]
+
+
+def test_nan_is_not_a_test():
+    pvalues  = np.array([ 0.01, np.nan, 0.04, 0.03, 0.2 ])
+    adjusted = fc.adjust(pvalues)
+    assert np.isnan(adjusted[1])
+    assert np.allclose(np.delete(adjusted, 1), BH)
+    assert not fc.significant(pvalues, 1.0)[1]
+    groups = np.array([ 'a', 'a', 'b', 'a', 'b' ])
+    assert np.isnan(fc.adjust(pvalues, 'bh', groups)[1])
+
+
+def test_step_up_rule():
+    # p(k) <= k/m Q for k = 3 only, the step-up rule rejects the 3 smallest
+    pvalues = np.array([ 0.02, 0.025, 0.03, 0.9 ])
+    assert list(fc.significant(pvalues, 0.04)) == [ True, True, True, False ]
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        fc.adjust(PValues, 'holm')
+    assert len(fc.adjust([])) == 0
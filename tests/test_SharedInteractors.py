@@ -0,0 +1,117 @@
+"""
+Program: test_SharedInteractors.py
+
+Purpose: Check the sparse shared interactor search of SharedInteractors on a tiny
+         background network against a naive loop over the edges, directed and
+         undirected, and hyperTail against scipy's hypergeom one value at a time.
+         Run with  python -m pytest tests/
+"""
+import numpy as np
+import os
+import pandas as pd
+import pytest
+import sys
+from scipy.stats import hypergeom
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))       # modules live in the repository root
+import BackgroundNetwork as bn
+import SharedInteractors as si
+
+# A, B, C in S1 all reach X; Y reaches B and is reached from A; Z has two edge rows from B
+Edges = pd.DataFrame([ ('A', 'X', 'ppi', 0), ('B', 'X', 'kinase_substrate', 1), ('C', 'X', 'ppi', 0),
+                       ('A', 'Y', 'ppi', 0), ('Y', 'B', 'ppi', 0), ('A', 'Z', 'ppi', 0),
+                       ('B', 'Z', 'ppi', 0), ('B', 'Z', 'phosphatase', 1), ('D', 'W', 'ppi', 0),
+                       ('B', 'W', 'ppi', 0), ('C', 'A', 'ppi', 0), ('B', 'C', 'ppi', 0) ],
+                     columns=bn.EdgeColumns)
+
+# Q is not in the network, the duplicate row counts once
+Members = pd.DataFrame([ ('S1', 'A'), ('S1', 'B'), ('S1', 'C'), ('S2', 'B'), ('S2', 'D'),
+                         ('S2', 'Q'), ('S1', 'A') ], columns=['Submodule', 'ORF'])
+
+
+def naiveShared(undirected, minTargets=si.MinTargets):
+    """ (Submodule, Shared_Interactor) -> (n, m) by looping over the edge rows """
+    result = {}
+    for sub, group in Members.drop_duplicates().groupby('Submodule'):
+        orfs   = set(group['ORF'])
+        counts = {}
+        if undirected:
+            pairs = set(zip(Edges['Protein1'], Edges['Protein2'])) | set(zip(Edges['Protein2'], Edges['Protein1']))
+            for prot, other in pairs:
+                if prot in orfs:
+                    counts[other] = counts.get(other, 0) + 1
+        else:
+            for prot, other in zip(Edges['Protein1'], Edges['Protein2']):
+                if prot in orfs:
+                    counts[other] = counts.get(other, 0) + 1
+        for other, m in counts.items():
+            if m >= minTargets:
+                result[(sub, other)] = (len(orfs), m)
+    return result
+
+
+@pytest.mark.parametrize('undirected', [ False, True ])
+def test_shared_interactors_match_naive_loop(undirected):
+    shared = si.sharedInteractors(Members, Edges, undirected=undirected)
+    found  = { (r.Submodule, r.Shared_Interactor) : (r.n, r.m) for r in shared.itertuples() }
+    assert found == naiveShared(undirected)
+    assert list(shared.columns) == [ 'Submodule', 'Shared_Interactor', 'n', 'm' ]
+    assert list(shared['Submodule'].unique()) == [ 'S1', 'S2' ]                   # order of first appearance
+    for sub, group in shared.groupby('Submodule'):
+        assert list(group['Shared_Interactor']) == sorted(group['Shared_Interactor'])
+
+
+def test_directed_and_undirected_counts():
+    directed   = si.sharedInteractors(Members, Edges).set_index(['Submodule', 'Shared_Interactor'])['m']
+    undirected = si.sharedInteractors(Members, Edges, undirected=True).set_index(['Submodule', 'Shared_Interactor'])['m']
+    assert directed[('S1', 'Z')] == 3                       # every edge row counts
+    assert undirected[('S1', 'Z')] == 2                     # every submodule protein counts once
+    assert ('S1', 'Y') not in directed.index                # Y -> B points away from the submodule
+    assert undirected[('S1', 'Y')] == 2
+    assert undirected[('S1', 'C')] == 2                     # submodule members are interactors too
+
+
+def test_min_targets_and_background_types():
+    network = bn.fromEdges(Edges)
+    assert si.sharedInteractors(Members, network).equals(si.sharedInteractors(Members, Edges))
+    assert set(si.sharedInteractors(Members, Edges, minTargets=3)['Shared_Interactor']) == { 'X', 'Z' }
+
+
+def test_interactor_targets_are_the_edges():
+    shared  = si.sharedInteractors(Members, Edges)
+    targets = si.interactorTargets(Members, Edges, shared)
+    naive   = []
+    for sub, inter in zip(shared['Submodule'], shared['Shared_Interactor']):
+        orfs = set(Members.loc[Members['Submodule'] == sub, 'ORF'])
+        rows = Edges[Edges['Protein1'].isin(orfs) & (Edges['Protein2'] == inter)]
+        naive += [ (a, b, t, sub) for a, b, t in zip(rows['Protein1'], rows['Protein2'], rows['Interaction']) ]
+    assert list(zip(targets['Submodule_Containing_Proteins'], targets['Possible_Shared_Interactors'],
+                    targets['Interaction'], targets['Submodule'])) == naive
+
+
+def test_empty_submodules():
+    none = pd.DataFrame({ 'Submodule' : [ 'S3' ], 'ORF' : [ 'Q' ] })
+    assert len(si.sharedInteractors(none, Edges)) == 0
+
+
+def test_hyper_tail_matches_scipy():
+    shared = si.sharedInteractors(Members, Edges, undirected=True)
+    network = bn.fromEdges(Edges)
+    M = network.degree(shared['Shared_Interactor'])
+    tail = si.hyperTail(network.N, M, shared['n'], shared['m'])
+    assert np.allclose(tail, [ hypergeom.sf(m - 1, network.N, Mi, n) for Mi, n, m in zip(M, shared['n'], shared['m']) ])
+
+
+def test_hyper_tail_repeated_keys_and_log():
+    # repeated (N, M, n, m) rows are computed once and scattered back in input order
+    N = np.array([ 4638, 4638, 200, 4638, 200, 4638 ])
+    M = np.array([ 76, 49, 30, 76, 30, 2000 ])
+    n = np.array([ 2, 31, 10, 2, 10, 1000 ])
+    m = np.array([ 2, 3, 4, 2, 4, 1000 ])
+    expected = [ hypergeom.sf(mi - 1, Ni, Mi, ni) for Ni, Mi, ni, mi in zip(N, M, n, m) ]
+    logTail  = [ hypergeom.logsf(mi - 1, Ni, Mi, ni) for Ni, Mi, ni, mi in zip(N, M, n, m) ]
+    assert np.allclose(si.hyperTail(N, M, n, m), expected, rtol=1e-12, atol=0)
+    assert np.allclose(si.hyperTail(N, M, n, m, log=True), logTail)
+    assert expected[-1] == 0.0                                                     # the last tail underflows to 0
+    assert np.isfinite(si.hyperTail(N, M, n, m, log=True)).all()                # its log does not
+    assert si.hyperTail(4638, 76, 2, 2).shape == (1,)
+    assert len(si.hyperTail([], [], [], [])) == 0
@@ -0,0 +1,78 @@
+"""
+Program: test_SubmoduleBuilder.py
+
+Purpose: Check that SubmoduleBuilder reproduces the Submodule,ORF list the notebook's line
+         parser wrote to Submodules.txt, on the example idModules table.
+         Run with  python -m pytest tests/
+"""
+import os
+import pandas as pd
+import sys
+Root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, Root)                                    # modules live in the repository root
+import SubmoduleBuilder as sb
+
+IdModules = os.path.join(Root, 'example', 'idModules.csv')
+
+
+def baselineMembers(inputData):
+    """ The notebook's original idModules parser, the set of "Submodule,ORF\\n" lines """
+    modData = set()
+    ct      = 4
+    with open(inputData) as file:
+        columns    = file.readline().rstrip().rsplit(',')
+        numStrains = len(columns[ct:])
+        for line in file:
+            row  = line.rstrip().split(',')
+            name = row[0].split('_')[0]
+            if row[2] == '':
+                continue
+            if row[ct:].count('') < numStrains:
+                for idx, val in enumerate(row[ct:]):
+                    if val == '':
+                        continue
+                    modData.add(row[1] + '_' + row[2] + '_' + columns[ct + idx] + '_' + val + ',' + name + '\n')
+            else:
+                modData.add(row[1] + '_' + row[2] + '_' + 'No_Phenotype_Exists' + ',' + name + '\n')
+    return modData
+
+
+def memberLines(table):
+    members = sb.submoduleMembers(table)
+    return set(members['Submodule'] + ',' + members['ORF'] + '\n')
+
+
+def test_baseline_members():
+    table = sb.buildSubmodules(pd.read_csv(IdModules), minSize=1)
+    assert memberLines(table) == baselineMembers(IdModules)
+
+
+def test_baseline_submodule_names():
+    table    = sb.buildSubmodules(pd.read_csv(IdModules), minSize=1)
+    baseline = set( line.rsplit(',', 1)[0] for line in baselineMembers(IdModules) )
+    assert set(table['subModule']) == baseline
+    assert set(table['Module']) == set( '_'.join(name.split('_')[:2]) for name in baseline )
+
+
+def test_schema_list_matches_header():
+    data = pd.read_csv(IdModules)
+    assert memberLines(sb.buildSubmodules(data, ['ire1', 'mkk1_2'], minSize=1)) == baselineMembers(IdModules)
+
+
+def test_min_size_drops_small_phenotype_submodules():
+    data  = pd.read_csv(IdModules)
+    full  = sb.buildSubmodules(data, minSize=1)
+    table = sb.buildSubmodules(data)
+    sizes   = full.groupby('subModule').size()
+    dropped = set(full['subModule']) - set(table['subModule'])
+    assert dropped
+    assert all( sizes[name] < 2 and not name.endswith(sb.NoPhenotype) for name in dropped )
+    assert memberLines(table) <= baselineMembers(IdModules)
+
+
+def test_write_submodules(tmp_path):
+    data     = pd.read_csv(IdModules)
+    filename = str(tmp_path / 'submodules.txt')
+    assert sb.writeSubmodules(data, filename) == len(sb.buildSubmodules(data))
+    written = pd.read_csv(filename, sep='\t', index_col=0)
+    assert memberLines(written) == memberLines(sb.buildSubmodules(data))
@@ -0,0 +1,85 @@
+"""
+Program: test_fdrTable.py
+
+Purpose: Check KLEngine.fdrTable on hand counted null distributions, and that
+         CalculateFDR_EachModule_toEachKinase_FINAL.py reads kullback-Leibler.py text
+         output.  Run with  python -m pytest tests/
+"""
+import importlib.util
+import numpy as np
+import os
+import pandas as pd
+import pytest
+import sys
+Root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, Root)                                                                        # modules live in the repository root
+import KLEngine as kle
+
+
+def calculateFDR():
+    """ The CalculateFDR script as a module """
+    spec   = importlib.util.spec_from_file_location('CalculateFDR', os.path.join(Root, 'python', 'CalculateFDR_EachModule_toEachKinase_FINAL.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+Observed = pd.DataFrame({ 'Scores' : [ 2.5, 0.5, 4.0, 1.0, 3.0 ],
+                          'Kinase' : [ 'k1', 'k2', 'k3', 'k1', 'k2' ],
+                          'Module' : [ 'M1', 'M1', 'M1', 'M2', 'M2' ] })
+
+Null = { 'M1' : np.array([ 3.0, 1.0, 2.0, 5.0, 2.5 ]),
+         'M2' : np.array([ [ 1.0, 0.5 ], [ 4.0, 2.0 ] ]) }                # any shape, raveled
+
+
+def test_counts_and_fdr():
+    table = kle.fdrTable(Observed, Null)
+    assert list(table.columns) == kle.FdrColumns
+    m1 = table[table['Module'] == 'M1']
+    # below 0.5: none, below 2.5 (strictly): 1.0, 2.0, below 4.0: 1.0, 2.0, 2.5, 3.0
+    assert list(m1['Kinase']) == [ 'k2', 'k1', 'k3' ]                       # sorted by FDR within the module
+    assert list(m1['Counts_Less_Than']) == [ 0, 2, 4 ]
+    assert np.allclose(m1['FDR'], [ 0.0, 0.4, 0.8 ])
+    m2 = table[table['Module'] == 'M2']
+    assert list(m2['Counts_Less_Than']) == [ 1, 3 ]
+    assert list(m2['Number_of_Scores']) == [ 4, 4 ]
+
+
+def test_matches_loop():
+    rng      = np.random.default_rng(5)
+    observed = pd.DataFrame({ 'Scores' : rng.random(60) * 10, 'Kinase' : [ 'k%d' %(i % 20) for i in range(60) ],
+                              'Module' : [ 'M%d' %(i // 20) for i in range(60) ] })
+    null  = { 'M%d' %(i) : np.round(rng.random(500) * 10, 1) for i in range(3) }
+    table = kle.fdrTable(observed, null)
+    for row in table.itertuples():
+        assert row.Counts_Less_Than == sum(x < row.Scores for x in null[row.Module])
+
+
+def test_missing_null_and_empty():
+    table = kle.fdrTable(Observed, { 'M2' : Null['M2'] })
+    assert set(table['Module']) == { 'M2' }
+    empty = kle.fdrTable(Observed, {})
+    assert len(empty) == 0 and list(empty.columns) == kle.FdrColumns
+    assert 'Adjusted_FDR' in kle.fdrTable(Observed, {}, correction='bh').columns
+
+
+def test_correction():
+    table = kle.fdrTable(Observed, Null, correction='bh')
+    m2    = table[table['Module'] == 'M2']
+    assert np.allclose(m2['Adjusted_FDR'], [ 0.5, 0.75 ])                  # FDR 0.25, 0.75, m = 2 per module
+    pooled = kle.fdrTable(Observed, Null, correction='bh', perModule=False)
+    assert (pooled['Adjusted_FDR'].values >= table['Adjusted_FDR'].values - 1e-12).all()
+
+
+def test_text_output(tmp_path):
+    """ kullback-Leibler.py text output, (score, 'kinase') lines, the module from the file name """
+    (tmp_path / 'M1.csv').write_text("(2.5, 'k1')\n(0.5, 'k2')\n(4.0, 'k3')\n")
+    (tmp_path / 'M2.csv').write_text("(1.0, 'k1')\n(3.0, 'k2')\n")
+    scores = calculateFDR().Read_CSV_Dir(str(tmp_path))
+    assert scores.equals(Observed[['Scores', 'Kinase', 'Module']])
+
+
+def test_csv_without_columns(tmp_path):
+    (tmp_path / 'M1.csv').write_text('a,b\n1,2\n')
+    with pytest.raises(ValueError):
+        calculateFDR().Read_CSV_Dir(str(tmp_path))
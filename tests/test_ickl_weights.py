@@ -0,0 +1,58 @@
+"""
+Program: test_ickl_weights.py
+
+Purpose: Check the ickl information weights on a real Mok kinase PWM (akl1), the
+         IC_Final weights as read by PWMRegistry and the per PWM scaling of
+         KLEngine.icklWeights.  Run with  python -m pytest tests/
+"""
+import numpy as np
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))       # modules live in the repository root
+import KLEngine as kle
+import PWMRegistry as pwr
+
+MokDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Mok_kinase_PWMs')
+
+
+def mokFile(name='akl1'):
+    return os.path.join(MokDir, 'Mok_Kinase_PWM_%s.csv' %(name))
+
+
+def mokPWM(name='akl1'):
+    registry = pwr.load(mokFile(name))
+    return registry.pwm, registry.information
+
+
+def test_mok_information_centre_only():
+    """ 1 - IC_Final / 100, ~0.96 at the central residue, close to 0 at every other position """
+    pwm, information = mokPWM()
+    centre = information.shape[1] // 2
+    assert information.shape == (1, 13)
+    assert np.isclose(information[0, centre], 1.0 - 3.963242123 / 100.0)
+    assert np.delete(information[0], centre).max() < 0.01
+    assert information[0, 0] == 0.0 and information[0, -1] == 0.0        # IC_Final 100, empty outer positions
+
+
+def test_ickl_weights_average_one():
+    pwm, information = mokPWM()
+    weights = kle.icklWeights(information)
+    assert np.allclose(weights.mean(axis=1), 1.0)
+    assert np.argmax(weights[0]) == information.shape[1] // 2
+    assert np.allclose(weights * information.mean(axis=1, keepdims=True), information)
+
+
+def test_ickl_weights_without_information():
+    weights = kle.icklWeights(np.zeros((2, 13)))
+    assert np.array_equal(weights, np.ones((2, 13)))
+
+
+def test_ickl_flat_weights_is_kl():
+    """ With weight 1 everywhere ickl is plain kl, and an engine scores a PWM against itself as 0 """
+    pwm, information = mokPWM()
+    other = mokPWM('cdc28')[0]
+    ones  = np.ones_like(pwm)
+    assert np.isclose(kle.pwmScore(pwm, other, 'ickl', WX=ones)[0, 0], kle.pwmScore(pwm, other, 'kl')[0, 0])
+    engine = kle.KLEngine(mokFile(), mokFile(), metric='ickl')
+    assert np.isclose(engine.score()[0, 0], 0.0)
+    assert np.allclose(engine.kinaseWeight[0, 0], kle.icklWeights(information)[0])
@@ -0,0 +1,46 @@
+"""
+Program: test_pseudocount_error.py
+
+Purpose: A module PWM holding a zero frequency stops kullback-Leibler.py with an ERROR line
+         that points to --pseudocount instead of a traceback, and runs with --pseudocount.
+         Run with  python -m pytest tests/
+"""
+import os
+import pandas as pd
+import subprocess
+import sys
+Root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+MokDir = os.path.join(Root, 'Mok_kinase_PWMs')
+Script = os.path.join(Root, 'kullback-Leibler.py')
+
+
+def zeroModules(tmp_path):
+    """ The cdc28 Mok PWM as module Mod0, with the alanine frequency at position 1 moved to cysteine """
+    df = pd.read_csv(os.path.join(MokDir, 'Mok_Kinase_PWM_cdc28.csv'), index_col=0)
+    df = df.assign(Motif='Mod0')[['Motif', 'AA'] + [ str(i) for i in range(13) ]].reset_index(drop=True)
+    df.loc[1, '1'] += df.loc[0, '1']
+    df.loc[0, '1'] = 0.0
+    path = str(tmp_path / 'zero.csv')
+    df.to_csv(path, index=False)
+    return path
+
+
+def run(modules, outDir, *args):
+    return subprocess.run([ sys.executable, Script, '-f', modules, '-m', MokDir, '-o', os.path.join(str(outDir), '') ] + list(args),
+                          capture_output=True, text=True)
+
+
+def test_zero_frequency_error(tmp_path):
+    result = run(zeroModules(tmp_path), tmp_path)
+    assert result.returncode == 1
+    assert 'Traceback' not in result.stderr
+    assert 'ERROR: module PWMs' in result.stdout
+    assert '--pseudocount' in result.stdout
+    assert 'Mod0' in result.stdout
+
+
+def test_zero_frequency_pseudocount(tmp_path):
+    result = run(zeroModules(tmp_path), tmp_path, '--pseudocount', '0.001')
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert os.path.exists(str(tmp_path / 'Mod0.csv'))
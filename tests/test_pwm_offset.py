@@ -0,0 +1,44 @@
+"""
+Program: test_pwm_offset.py
+
+Purpose: Check the offset search window of KLEngine.pwmOffset and KLEngine, shifts
+         outside 0 ... width - 1 are rejected instead of scoring inf.
+         Run with  python -m pytest tests/
+"""
+import numpy as np
+import os
+import pytest
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))       # modules live in the repository root
+import KLEngine as kle
+
+MokDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Mok_kinase_PWMs')
+
+
+def randomPWMs(n, width=13, seed=1):
+    pwm = np.random.default_rng(seed).random((n, 20, width)) + 0.01
+    return pwm / pwm.sum(axis=1, keepdims=True)
+
+
+def test_shift_zero_is_fixed_alignment():
+    X, Y = randomPWMs(4), randomPWMs(3, seed=2)
+    scores, offsets = kle.pwmOffset(X, Y, 0)
+    assert np.allclose(scores, kle.pwmScore(X, Y))
+    assert not offsets.any()
+
+
+def test_shift_finds_shifted_copy():
+    X = randomPWMs(1)
+    Y = np.roll(X, 2, axis=2)
+    scores, offsets = kle.pwmOffset(X, Y, 3)
+    assert np.isfinite(scores).all()
+    assert offsets[0, 0] == 2
+
+
+@pytest.mark.parametrize('shift', [ -1, 13 ])
+def test_shift_out_of_range(shift):
+    X = randomPWMs(2)
+    with pytest.raises(ValueError):
+        kle.pwmOffset(X, X, shift)
+    with pytest.raises(ValueError):
+        kle.KLEngine(MokDir, MokDir, maxShift=shift)
@@ -0,0 +1,118 @@
+"""
+Program: test_reproducibility.py
+
+Purpose: Lock in that a seeded kullback-Leibler.py shuffle run writes the same scores
+         however it is run: with 1 or several processes, killed and resumed from its
+         checkpoint, or split into shards and merged.  Every run shuffles the 63 Mok
+         kinases against two Mok PWMs used as modules, 250 shuffles (3 blocks, the last
+         one partial).  Run with  python -m pytest tests/
+"""
+import glob
+import importlib.util
+import os
+import pandas as pd
+import pytest
+import subprocess
+import sys
+Root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, Root)                                                                        # modules live in the repository root
+import KLEngine as kle
+
+MokDir     = os.path.join(Root, 'Mok_kinase_PWMs')
+Script     = os.path.join(Root, 'kullback-Leibler.py')
+Iterations = '250'
+Seed       = '2018'
+
+
+@pytest.fixture(scope='module')
+def modules(tmp_path_factory):
+    """ Module PWM file, two Mok PWMs under module names """
+    path = tmp_path_factory.mktemp('modules') / 'modules.csv'
+    pwms = []
+    for name, kinase in [ ('Mod0', 'cdc28'), ('Mod1', 'akl1') ]:
+        df = pd.read_csv(os.path.join(MokDir, 'Mok_Kinase_PWM_%s.csv' %(kinase)), index_col=0)
+        pwms.append(df.assign(Motif=name)[['Motif', 'AA'] + [ str(i) for i in range(13) ]])
+    pd.concat(pwms).to_csv(path, index=False)
+    return str(path)
+
+
+def run(modules, outDir, *args):
+    subprocess.run([ sys.executable, Script, '-f', modules, '-m', MokDir, '-i', Iterations, '-s', Seed,
+                     '-o', os.path.join(str(outDir), '') ] + list(args), check=True, capture_output=True)
+
+
+def storeBytes(outDir):
+    with open(os.path.join(str(outDir), kle.StoreArray), 'rb') as f:
+        return f.read()
+
+
+def textBytes(outDir):
+    return { os.path.basename(p) : open(p, 'rb').read() for p in sorted(glob.glob(os.path.join(str(outDir), '*.csv'))) }
+
+
+@pytest.fixture(scope='module')
+def reference(modules, tmp_path_factory):
+    """ Single process binary run, every other run must write exactly its scores """
+    outDir = tmp_path_factory.mktemp('reference')
+    run(modules, outDir, '-b', '-p', '1')
+    return storeBytes(outDir)
+
+
+def test_process_count(modules, reference, tmp_path):
+    run(modules, tmp_path, '-b', '-p', '3')
+    assert storeBytes(tmp_path) == reference
+
+
+def test_text_process_count(modules, tmp_path):
+    run(modules, tmp_path / 'one', '-p', '1')
+    run(modules, tmp_path / 'three', '-p', '3')
+    assert textBytes(tmp_path / 'one') == textBytes(tmp_path / 'three')
+
+
+class Killed(Exception):
+    pass
+
+
+def interrupted(monkeypatch, modules, outDir, after, binary):
+    """ Run kullback-Leibler.py main in this process, checkpointing after every block, and
+    stop it with an exception after the given number of blocks like a killed run """
+    spec = importlib.util.spec_from_file_location('kullback_Leibler', Script)
+    kl   = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(kl)
+    runBlocks = kle.runBlocks
+
+    def dying(*args, **kwargs):
+        for count, result in enumerate(runBlocks(*args, **kwargs)):
+            if count == after:
+                raise Killed()
+            yield result
+
+    argv = [ Script, '-f', modules, '-m', MokDir, '-i', Iterations, '-s', Seed, '-p', '1',
+             '--checkpoint', '0', '-o', os.path.join(str(outDir), '') ] + ([ '-b' ] if binary else [])
+    monkeypatch.setattr(sys, 'argv', argv)
+    monkeypatch.setattr(kle, 'runBlocks', dying)
+    with pytest.raises(Killed):
+        kl.main()
+    monkeypatch.setattr(kle, 'runBlocks', runBlocks)
+    state = kle.loadCheckpoint(str(outDir))
+    assert state is not None and not state['complete'] and len(state['done']) == after
+    kl.main()                                                                   # started again, resumes
+    assert kle.loadCheckpoint(str(outDir))['complete']
+
+
+def test_kill_and_resume(monkeypatch, modules, reference, tmp_path):
+    interrupted(monkeypatch, modules, tmp_path, 50, binary=True)
+    assert storeBytes(tmp_path) == reference
+
+
+def test_text_kill_and_resume(monkeypatch, modules, tmp_path):
+    run(modules, tmp_path / 'full', '-p', '1')
+    interrupted(monkeypatch, modules, tmp_path / 'resumed', 50, binary=False)
+    assert textBytes(tmp_path / 'resumed') == textBytes(tmp_path / 'full')
+
+
+def test_shards_merge(modules, reference, tmp_path):
+    for shard in range(3):
+        run(modules, tmp_path, '--shard', '%d/3' %(shard))
+    subprocess.run([ sys.executable, Script, 'merge', '-o', str(tmp_path) ], check=True, capture_output=True)
+    assert storeBytes(tmp_path) == reference
@@ -0,0 +1,73 @@
+"""
+Program: test_shuffle_cache.py
+
+Purpose: Check the KLEngine ShuffleCache, blocks are keyed on the kinase PWM values so an
+         edited PWM does not reuse stale shuffles, cached blocks equal freshly drawn ones,
+         and written() keeps the cache within maxBytes while a run is writing blocks.
+         Run with  python -m pytest tests/
+"""
+import numpy as np
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))       # modules live in the repository root
+import KLEngine as kle
+
+
+def kinasePWM(seed=0):
+    pwm = np.random.default_rng(seed).random((20, 15))
+    return pwm / pwm.sum(axis=0)
+
+
+def cacheSize(cache):
+    return sum( os.path.getsize(os.path.join(cache.cacheDir, f)) for f in os.listdir(cache.cacheDir) if f.endswith('.npy') )
+
+
+def test_key_includes_pwm(tmp_path):
+    cache  = kle.ShuffleCache(str(tmp_path), 1 << 30)
+    pwm    = kinasePWM()
+    edited = pwm.copy()
+    edited[0, 0] += 1e-9
+    assert cache.key(pwm, 2018, 0, 0, 100) == cache.key(pwm.copy(), 2018, 0, 0, 100)
+    assert cache.key(pwm, 2018, 0, 0, 100) != cache.key(edited, 2018, 0, 0, 100)
+    assert cache.key(pwm, 2018, 0, 0, 100) != cache.key(pwm, 2018, 0, 1, 100)
+
+
+def test_edited_pwm_is_not_a_cache_hit(tmp_path):
+    cache  = kle.ShuffleCache(str(tmp_path), 1 << 30)
+    pwm    = kinasePWM()
+    edited = kinasePWM(1)
+    kle.blockIndex(pwm, 2018, 0, 0, 100, cache)
+    assert cache.get(cache.key(pwm, 2018, 0, 0, 100)) is not None
+    assert cache.get(cache.key(edited, 2018, 0, 0, 100)) is None
+
+
+def test_cached_block_matches_drawn(tmp_path):
+    cache = kle.ShuffleCache(str(tmp_path), 1 << 30)
+    pwm   = kinasePWM()
+    drawn = kle.blockShuffle(pwm, 2018, 3, 1, 50)
+    assert np.array_equal(kle.blockShuffle(pwm, 2018, 3, 1, 50, cache), drawn)       # miss, stored
+    assert np.array_equal(kle.blockShuffle(pwm, 2018, 3, 1, 50, cache), drawn)       # hit
+
+
+def test_written_prunes_during_run(tmp_path):
+    pwm   = kinasePWM()
+    block = kle.blockIndex(pwm, 2018, 0, 0, 100).nbytes
+    cache = kle.ShuffleCache(str(tmp_path), 4 * block, pruneEvery=2)
+    for kIdx in range(20):
+        kle.blockIndex(pwm, 2018, kIdx, 0, 100, cache)
+        path = os.path.join(cache.cacheDir, cache.key(pwm, 2018, kIdx, 0, 100) + '.npy')
+        os.utime(path, (kIdx, kIdx))                                                  # distinct times, LRU order
+        cache.written()
+        assert cacheSize(cache) <= 4 * block + 2 * block + 2 * 1024                   # limit, unpruned blocks and npy headers
+    cache.prune()
+    assert cacheSize(cache) <= 4 * block
+    assert cache.get(cache.key(pwm, 2018, 19, 0, 100)) is not None                   # most recent block kept
+    assert cache.get(cache.key(pwm, 2018, 0, 0, 100)) is None
+
+
+def test_get_after_prune(tmp_path):
+    cache = kle.ShuffleCache(str(tmp_path), 0)
+    pwm   = kinasePWM()
+    kle.blockIndex(pwm, 2018, 0, 0, 100, cache)
+    cache.prune()
+    assert cache.get(cache.key(pwm, 2018, 0, 0, 100)) is None